@@ -1,7 +1,7 @@
 import asyncio
 import json
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from os import environ as env
 
 import discord
@@ -11,16 +11,34 @@ from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
-from discord import Member
+from apscheduler.triggers.interval import IntervalTrigger
+from discord import Member, app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 from quart import Quart, make_response, request
 
 import system.configuration
+import system.courier
+import system.dispatcher
+import system.embedder
 import system.historian
-from commands.messages import embed_member_leave_guild, embed_message_delete, embeds_message_edit, p_embed_kofi
-from commands.utils import is_guild_configured
-from data.interface import initialise
+from commands.cog_config import EditLog
+from commands.messages import embed_member_leave_guild, embed_message_delete, embeds_message_edit, p_embed_kofi, \
+    embed_premium_error, embed_message_edit_diff
+from commands.filters import event_filter
+from commands.utils import is_guild_configured, PremiumRequired
+import data.asynchronous
+import data.attachments
+import data.backup
+import data.database
+import data.interface
+import data.logs
+import data.maintenance
+import data.messages
+import data.migrations
+import data.models
+from data.logs import LogEntry, LogKind
+from data.messages import StoredMessage
 from system.timekeeper import run_in_loop, set_instance
 
 load_dotenv()
@@ -52,16 +70,43 @@ def scheduler_listener(event):
 
 class Bai(commands.Bot):
     scheduler: AsyncIOScheduler
+    outbound: system.dispatcher.Dispatcher
+    courier: system.courier.Courier
+    message_store: data.messages.MessageStore
+    log_archive: data.logs.LogArchive
+    attachment_archive: data.attachments.AttachmentArchive | None = None
+    embedder: system.embedder.Embedder
 
     async def setup_hook(self):
+        self.outbound = system.dispatcher.Dispatcher(
+            channel_rate=configuration.outbound.channel_rate,
+            global_rate=configuration.outbound.global_rate,
+            headroom=configuration.outbound.headroom
+        )
+        self.courier = system.courier.Courier(self.outbound, configuration.audit.flush_window_ms / 1000, logger)
+        self.embedder = system.embedder.Embedder(
+            configuration.embeddings.model,
+            configuration.embeddings.device,
+            logger,
+            window=configuration.embeddings.window_ms / 1000,
+            max_batch=configuration.embeddings.max_batch,
+            max_pending=configuration.embeddings.max_pending
+        )
+
         self.loop.create_task(
             web.run_task(
                 host='0.0.0.0', port=4443, certfile='./cert.pem', keyfile='./key.pem', debug=False
             )
         )
 
+        if configuration.database.backend == "sqlite":
+            # the one-off rewrite has to finish before the scheduler or the migrations open either file
+            for path in (configuration.database.path, configuration.database.jobs_path):
+                if await asyncio.to_thread(data.maintenance.enable_incremental_vacuum, path):
+                    logger.info(f"Switched {path} to incremental auto-vacuum")
+
         jobstores = {
-            'default': SQLAlchemyJobStore(url="sqlite:///jobs.sqlite")
+            'default': SQLAlchemyJobStore(url=data.database.jobs_url(configuration.database))
         }
         executors = {
             'default': AsyncIOExecutor()
@@ -79,6 +124,65 @@ class Bai(commands.Bot):
         self.scheduler.add_listener(scheduler_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
         self.scheduler.start()
 
+        data.database.configure(configuration.database)
+        self.message_store = data.messages.MessageStore(
+            configuration.messages.path,
+            max_rows=configuration.messages.max_rows,
+            interval=configuration.messages.flush_ms / 1000,
+            logger=logger
+        )
+        self.message_store.start()
+        self.log_archive = data.logs.LogArchive(
+            configuration.logs.path,
+            interval=configuration.logs.flush_ms / 1000,
+            logger=logger
+        )
+        self.log_archive.start()
+
+        if configuration.attachments.enabled:
+            self.attachment_archive = data.attachments.AttachmentArchive(
+                configuration.attachments.directory,
+                concurrency=configuration.attachments.concurrency,
+                guild_quota=configuration.attachments.guild_quota_mb << 20,
+                max_file=configuration.attachments.max_file_mb << 20
+            )
+            self.attachment_archive.start()
+        data.interface.guild_cache.ttl = configuration.database.cache_ttl
+        data.asynchronous.start(workers=configuration.database.workers)
+
+        if configuration.database.group_commit['enabled']:
+            data.asynchronous.start_group_commit(
+                window_ms=configuration.database.group_commit['window_ms'],
+                max_batch=configuration.database.group_commit['max_batch']
+            )
+
+        version = await data.asynchronous.run(data.migrations.run)
+        logger.info(f'Database schema at version {version}')
+        await data.asynchronous.load_guilds()
+        await data.asynchronous.load_subscribers()
+
+        self.scheduler.add_job(
+            run_in_loop,
+            trigger=IntervalTrigger(hours=configuration.archive.interval_hours),
+            args=["archive_raids"],
+            id="archive_raids",
+            replace_existing=True
+        )
+        self.scheduler.add_job(
+            run_in_loop,
+            trigger=IntervalTrigger(hours=configuration.backup.interval_hours),
+            args=["backup_databases"],
+            id="backup_databases",
+            replace_existing=True
+        )
+        self.scheduler.add_job(
+            run_in_loop,
+            trigger=IntervalTrigger(hours=configuration.maintenance.interval_hours),
+            args=["maintain_databases"],
+            id="maintain_databases",
+            replace_existing=True
+        )
+
         await self.load_extension('commands.cog_config')
         await self.load_extension('commands.cog_jail')
         await self.load_extension('commands.cog_premium')
@@ -88,6 +192,87 @@ class Bai(commands.Bot):
 
         set_instance(self)
 
+    async def close(self):
+        # pending log embeds need the HTTP session, which super().close() tears down
+        await self.courier.close()
+        await self.outbound.close()
+        await self.embedder.close()
+        await super().close()
+        await self.message_store.close()
+        await self.log_archive.close()
+
+        if self.attachment_archive is not None:
+            await self.attachment_archive.close()
+        await data.asynchronous.stop_group_commit()
+        data.asynchronous.shutdown()
+        data.database.close()
+
+    async def archive_raids(self):
+        before = datetime.now() - timedelta(days=configuration.archive.after_days)
+        archived = await data.asynchronous.archive_raids(before)
+        logger.info(f"Archived {archived} raid(s) that happened before {before}")
+
+    async def backup_databases(self):
+        if not data.database.is_sqlite():
+            return
+
+        for source in (configuration.database.path, configuration.database.jobs_path):
+            report = await asyncio.to_thread(
+                data.backup.backup,
+                source,
+                configuration.backup.directory,
+                configuration.backup.keep,
+                configuration.backup.pages,
+                configuration.backup.pause_ms / 1000
+            )
+            logger.info(f"Backed up {source} to {report.path} ({report.size} bytes) in {report.duration:.2f}s")
+
+    async def maintain_databases(self):
+        start, end = configuration.maintenance.quiet_hours
+        hour = datetime.now().hour
+
+        if start <= end:
+            quiet = start <= hour < end
+        else:
+            # quiet hours such as [22, 4] wrap around midnight
+            quiet = hour >= start or hour < end
+
+        if not quiet:
+            return
+
+        inmates = {}
+        since = data.models.epoch_now()
+
+        for guild in self.guilds:
+            wrap, _ = is_guild_configured(guild.id)
+            role = guild.get_role(wrap.configuration.get('inmate_role', 0))
+
+            # an incomplete member list would make jailed inmates look like orphans
+            if role is None or not guild.chunked:
+                continue
+
+            inmates[guild.id] = {member.id for member in role.members}
+
+        report = await data.asynchronous.run(
+            data.maintenance.sweep,
+            configuration.maintenance.retention,
+            inmates,
+            since,
+            configuration.maintenance.vacuum_pages,
+            configuration.database.jobs_path
+        )
+        logger.info(f"Pruned {report['riddles']} riddle(s) and {report['subscribers']} subscriber(s), "
+                    f"reclaimed {report['reclaimed']} bytes")
+
+        cutoff = int((datetime.now() - timedelta(days=configuration.logs.retention_days)).timestamp())
+        pruned = await asyncio.to_thread(self.log_archive.prune, cutoff)
+        logger.info(f"Pruned {pruned} archived log entries")
+
+        if self.attachment_archive is not None:
+            cutoff = int((datetime.now() - timedelta(days=configuration.attachments.retention_days)).timestamp())
+            removed = await asyncio.to_thread(self.attachment_archive.prune, cutoff)
+            logger.info(f"Removed {removed} preserved attachment(s)")
+
     async def send_scheduled_message(self, channel_id: int, text: str):
         channel = self.get_channel(channel_id)
 
@@ -95,7 +280,7 @@ class Bai(commands.Bot):
             logger.warning(f"Channel {channel_id} was not found")
             return
 
-        await channel.send(text)
+        await self.outbound.send(channel, system.dispatcher.Priority.RaidPing, content=text)
 
     def unschedule_job(self, job_id: str):
         self.scheduler.remove_job(job_id)
@@ -149,7 +334,8 @@ async def handle_kofi(data):
 @bot.event
 async def on_ready():
     logger.info(f'Logged in as {bot.user.name}#{bot.user.discriminator}')
-    initialise()
+    # loads once; /solve falls back to exact matching until the model is ready
+    bot.embedder.load()
 
 
 @bot.event
@@ -162,52 +348,152 @@ async def on_command_error(ctx: commands.Context, error: commands.CommandError):
     pass
 
 
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, PremiumRequired):
+        await interaction.response.send_message(embed=embed_premium_error(), ephemeral=True)
+        return
+
+    await app_commands.CommandTree.on_error(bot.tree, interaction, error)
+
+
+async def recall_message(i_message: int, cached: discord.Message | None) -> StoredMessage | None:
+    if cached is not None:
+        return StoredMessage.from_message(cached)
+
+    return await bot.message_store.get(i_message)
+
+
+async def preserved_files(message: StoredMessage) -> list[tuple[str, str]]:
+    if bot.attachment_archive is None or len(message.attachments) == 0:
+        return []
+
+    return await bot.attachment_archive.files(message.id)
+
+
+async def audit_channel(i_guild: int) -> tuple[data.interface.GuildWrapper, discord.abc.GuildChannel | None]:
+    # gateway handlers must not wait on the database, so a guild missing from the cache is read on a data worker
+    guild = await data.asynchronous.create_guild(i_guild)
+    server = bot.get_guild(i_guild)
+
+    return guild, None if server is None else server.get_channel(guild.configuration.get('log_channel'))
+
+
+def archive_message(e_kind: LogKind, message: StoredMessage, s_before: str = None) -> LogEntry:
+    content = " ".join([message.content] + [attachment.filename for attachment in message.attachments])
+
+    return LogEntry(e_kind, message.guild_id, message.channel_id, message.author_id, message.author_name, message.id,
+                    s_before, content, int(datetime.now().timestamp()))
+
+
+@bot.event
+async def on_message(message: discord.Message):
+    if event_filter.message(message):
+        bot.message_store.put(StoredMessage.from_message(message))
+
+        if bot.attachment_archive is not None and len(message.attachments) > 0:
+            guild = await data.asynchronous.create_guild(message.guild.id)
+
+            if guild.configuration.get('archive_attachments', False):
+                bot.attachment_archive.preserve(message)
+
+    await bot.process_commands(message)
+
+
 @bot.event
-async def on_message_edit(before: discord.Message, after: discord.Message):
-    if not before and not after:
+async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
+    if not event_filter.edit(payload):
         return
 
-    if not before.guild and not after.guild:
+    before = await recall_message(payload.message_id, payload.cached_message)
+
+    if before is None:
         return
 
-    guild, is_configured = is_guild_configured(before.guild.id or after.guild.id)
+    after = before.edited(payload.data)
 
-    if not is_configured:
+    if not event_filter.edited(before, after):
         return
 
-    channel = before.guild.get_channel(guild.configuration['log_channel'])
-    b, b_a, a, a_a = embeds_message_edit(before, after)
+    bot.message_store.put(after)
+    bot.log_archive.put(archive_message(LogKind.Edit, after, before.content))
 
-    embeds_b = [b] + b_a
-    embeds_a = [a] + a_a
+    guild, channel = await audit_channel(payload.guild_id)
+
+    if channel is None:
+        return
 
-    await channel.send(embeds=embeds_b)
-    await channel.send(embeds=embeds_a)
+    if guild.configuration.get('edit_log', configuration.audit.edit_log) == EditLog.Diff:
+        e, e_a = embed_message_edit_diff(before, after)
+        bot.courier.post(channel, [e] + e_a)
+    else:
+        b, b_a, a, a_a = embeds_message_edit(before, after)
+        bot.courier.post(channel, [b] + b_a + [a] + a_a)
 
 
 @bot.event
-async def on_message_delete(message: discord.Message):
-    guild, is_configured = is_guild_configured(message.guild.id)
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    if not event_filter.delete(payload.guild_id, payload.channel_id, payload.cached_message):
+        return
+
+    message = await recall_message(payload.message_id, payload.cached_message)
+
+    if message is None:
+        return
 
-    if not is_configured:
+    bot.message_store.discard([payload.message_id])
+    bot.log_archive.put(archive_message(LogKind.Delete, message))
+
+    _, channel = await audit_channel(payload.guild_id)
+
+    # without a log channel there is nothing to build embeds for or to wait on attachment downloads for
+    if channel is None:
         return
 
-    channel = message.guild.get_channel(guild.configuration['log_channel'])
     e, e_a = embed_message_delete(message)
-    embeds = [e] + e_a
+    bot.courier.post(channel, [e] + e_a, await preserved_files(message))
+
+
+@bot.event
+async def on_raw_bulk_message_delete(payload: discord.RawBulkMessageDeleteEvent):
+    if not event_filter.delete(payload.guild_id, payload.channel_id):
+        return
+
+    cached = {message.id: message for message in payload.cached_messages}
+    _, channel = await audit_channel(payload.guild_id)
+
+    for i_message in sorted(payload.message_ids):
+        message = await recall_message(i_message, cached.get(i_message))
+
+        if message is None or message.author_bot:
+            continue
+
+        bot.log_archive.put(archive_message(LogKind.Delete, message))
 
-    await channel.send(embeds=embeds)
+        if channel is None:
+            continue
+
+        e, e_a = embed_message_delete(message)
+        bot.courier.post(channel, [e] + e_a, await preserved_files(message))
+
+    bot.message_store.discard(list(payload.message_ids))
 
 
 @bot.event
 async def on_member_remove(member: Member):
-    guild, is_configured = is_guild_configured(member.guild.id)
+    if not event_filter.member(member.guild.id):
+        return
+
+    bot.log_archive.put(LogEntry(
+        LogKind.Leave, member.guild.id, None, member.id, member.name, None, None, "", int(datetime.now().timestamp())
+    ))
+
+    _, channel = await audit_channel(member.guild.id)
 
-    if not is_configured:
+    if channel is None:
         return
 
-    channel = member.guild.get_channel(guild.configuration['log_channel'])
-    await channel.send(embed=embed_member_leave_guild(member=member))
+    bot.courier.post(channel, [embed_member_leave_guild(member=member)])
 
 
 # async def init():
@@ -4,7 +4,8 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from data.interface import update_guild
+from commands.utils import is_guild_configured
+from data.asynchronous import update_guild
 
 
 class Channel(str, enum.Enum):
@@ -12,6 +13,11 @@ class Channel(str, enum.Enum):
     LogChannel = "log_channel"
 
 
+class EditLog(str, enum.Enum):
+    Full = "full"
+    Diff = "diff"
+
+
 class Role(str, enum.Enum):
     InmateRole = "inmate_role"
     MemberRole = "member_role"
@@ -39,7 +45,7 @@ class Configuration(commands.Cog):
             return
 
         temp_config: dict = {channel: value.id}
-        update_guild(interaction.guild.id, o_configuration=temp_config)
+        await update_guild(interaction.guild.id, o_configuration=temp_config)
 
         await interaction.response.send_message("OK", ephemeral=True)
 
@@ -53,10 +59,59 @@ class Configuration(commands.Cog):
             return
 
         temp_config: dict = {role: value.id}
-        update_guild(interaction.guild.id, o_configuration=temp_config)
+        await update_guild(interaction.guild.id, o_configuration=temp_config)
+
+        await interaction.response.send_message("OK", ephemeral=True)
+
+
+    @group.command(name="editlog", description="Choose how message edits are logged")
+    @app_commands.describe(mode="Full before and after messages, or one compact diff")
+    async def editlog(self, interaction: discord.Interaction, mode: EditLog):
+        if not await self.__is_admin_or_owner(interaction):
+            await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
+            return
+
+        temp_config: dict = {'edit_log': mode.value}
+        await update_guild(interaction.guild.id, o_configuration=temp_config)
 
         await interaction.response.send_message("OK", ephemeral=True)
 
 
+    @group.command(name="archive", description="Preserve attachments so deleted ones can be re-uploaded to the logs")
+    @app_commands.describe(enabled="Whether attachments should be preserved")
+    async def archive(self, interaction: discord.Interaction, enabled: bool):
+        if not await self.__is_admin_or_owner(interaction):
+            await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
+            return
+
+        temp_config: dict = {'archive_attachments': enabled}
+        await update_guild(interaction.guild.id, o_configuration=temp_config)
+
+        await interaction.response.send_message("OK", ephemeral=True)
+
+
+    @group.command(name="ignore", description="Toggle whether a channel is left out of the logs")
+    @app_commands.describe(channel="The channel to ignore or watch again")
+    async def ignore(self, interaction: discord.Interaction, channel: discord.TextChannel):
+        if not await self.__is_admin_or_owner(interaction):
+            await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
+            return
+
+        guild, _ = is_guild_configured(interaction.guild.id)
+        ignored: list[int] = guild.configuration.get('ignored_channels', [])
+
+        if channel.id in ignored:
+            ignored = [i for i in ignored if i != channel.id]
+        else:
+            ignored = ignored + [channel.id]
+
+        temp_config: dict = {'ignored_channels': ignored}
+        await update_guild(interaction.guild.id, o_configuration=temp_config)
+
+        await interaction.response.send_message(
+            f"{channel.mention} is now {'ignored' if channel.id in ignored else 'logged'}.", ephemeral=True
+        )
+
+
 async def setup(bot):
     await bot.add_cog(Configuration(bot))
\ No newline at end of file
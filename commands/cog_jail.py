@@ -3,13 +3,13 @@ import asyncio
 import requests
 from discord import app_commands, Interaction, Member
 from discord.ext import commands
-from sentence_transformers import SentenceTransformer, util
 
 from commands.cog_config import Role
 from commands.messages import embed_api_error, embed_permissions_error, embed_configuration_error, message_imprisonment, \
     message_wrong, message_right, message_switch_sudoku
 from commands.utils import is_guild_configured, is_user_warden, is_user_imprisoned, is_valid_user_solution
-from data.interface import create_riddle, delete_riddle, read_riddle, update_riddle
+from data.asynchronous import create_riddle, delete_riddle, read_riddle, update_riddle, update_riddle_embedding
+from system.dispatcher import Priority
 
 
 class Jail(commands.Cog):
@@ -17,7 +17,6 @@ class Jail(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
 
 
     @group.command(name="imprison", description="Punish naughty people")
@@ -58,8 +57,9 @@ class Jail(commands.Cog):
         riddle_json = response.json()
 
         channel = interaction.guild.get_channel(guild.configuration['jail_channel'])
-        riddle = create_riddle(guild.id, member.id, riddle_json["riddle"], riddle_json["answer"])
-        await channel.send(message_imprisonment(riddle, member))
+        embedding = await self.bot.embedder.embed(riddle_json["answer"])
+        riddle = await create_riddle(guild.id, member.id, riddle_json["riddle"], riddle_json["answer"], embedding)
+        await self.bot.outbound.send(channel, Priority.Interaction, content=message_imprisonment(riddle, member))
 
 
     @group.command(name="release", description="Release them naughties")
@@ -80,7 +80,7 @@ class Jail(commands.Cog):
             return
 
         await inmate.remove_roles(interaction.guild.get_role(guild.configuration['inmate_role']))
-        delete_riddle(interaction.guild.id, inmate.id)
+        await delete_riddle(interaction.guild.id, inmate.id)
 
         await interaction.response.send_message("User is now out of jail!", ephemeral=True)
 
@@ -94,36 +94,44 @@ class Jail(commands.Cog):
             await interaction.response.send_message(embed=embed_configuration_error(guild), ephemeral=True)
             return
 
-        riddle = read_riddle(interaction.guild.id, interaction.user.id)
+        riddle = await read_riddle(interaction.guild.id, interaction.user.id)
 
         if not is_user_imprisoned(guild, interaction.user) and riddle is None:
             await interaction.response.send_message("You don't have a riddle to solve!", ephemeral=True)
             return
 
-        embedding_solution = self.model.encode(riddle.solution, convert_to_tensor=True)
-        embedding_answer = self.model.encode(answer, convert_to_tensor=True)
-        similarity = util.pytorch_cos_sim(embedding_solution, embedding_answer)
+        # the embedding queue may apply backpressure, which must not run into Discord's three second deadline
+        await interaction.response.defer()
 
-        if not riddle.is_sudoku and similarity.item() < 0.75:
-            await interaction.response.send_message(message_wrong(riddle))
-            return
+        if not riddle.is_sudoku:
+            if riddle.solution_embedding is None and self.bot.embedder.ready:
+                # riddles handed out while the model was loading get their embedding on the first attempt
+                riddle.solution_embedding = await self.bot.embedder.embed(riddle.solution)
+                await update_riddle_embedding(riddle.guild_id, riddle.user, riddle.solution_embedding)
+
+            # until the model is ready this is an exact match of the normalised texts
+            similarity = await self.bot.embedder.similarity(riddle.solution, answer, riddle.solution_embedding)
+
+            if similarity < 0.75:
+                await interaction.followup.send(message_wrong(riddle))
+                return
 
         is_user_solution = False
 
-        if riddle.is_sudoku and similarity.item() < 1.00:
+        if riddle.is_sudoku and answer != riddle.solution:
             grid_array = [list(map(int, riddle.text[i:i + 9])) for i in range(0, len(riddle.text), 9)]
             answer_array = [list(map(int, answer[i:i + 9])) for i in range(0, len(answer), 9)]
 
             if not is_valid_user_solution(grid_array, answer_array):
-                await interaction.response.send_message(message_wrong(riddle))
+                await interaction.followup.send(message_wrong(riddle))
                 return
 
             is_user_solution = True
 
-        await interaction.response.send_message(message_right(riddle, is_user_solution))
+        await interaction.followup.send(message_right(riddle, is_user_solution))
         await asyncio.sleep(10)
 
-        delete_riddle(interaction.guild.id, interaction.user.id)
+        await delete_riddle(interaction.guild.id, interaction.user.id)
         await interaction.user.remove_roles(interaction.guild.get_role(guild.configuration['inmate_role']))
 
 
@@ -135,7 +143,7 @@ class Jail(commands.Cog):
             await interaction.response.send_message(embed=embed_configuration_error(guild), ephemeral=True)
             return
 
-        riddle = read_riddle(interaction.guild.id, interaction.user.id)
+        riddle = await read_riddle(interaction.guild.id, interaction.user.id)
 
         if not is_user_imprisoned(guild, interaction.user) and riddle is None:
             await interaction.response.send_message("You don't have a riddle to solve!", ephemeral=True)
@@ -160,13 +168,13 @@ class Jail(commands.Cog):
         sudoku_grid_string = ''.join(str(num) for row in sudoku_grid for num in row)
         sudoku_solution_string = ''.join(str(num) for row in sudoku_solution for num in row)
 
-        riddle = update_riddle(interaction.guild.id, interaction.user.id, sudoku_grid_string,
+        riddle = await update_riddle(interaction.guild.id, interaction.user.id, sudoku_grid_string,
                                sudoku_solution_string, True)
 
         await interaction.response.send_message("Heh. Good luck!", ephemeral=True)
 
         channel = interaction.guild.get_channel(guild.configuration['jail_channel'])
-        await channel.send(message_switch_sudoku(riddle, interaction.user, sudoku_difficulty))
+        await self.bot.outbound.send(channel, Priority.Interaction, content=message_switch_sudoku(riddle, interaction.user, sudoku_difficulty))
 
 
 async def setup(bot):
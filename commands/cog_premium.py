@@ -5,7 +5,7 @@ from discord import app_commands
 from discord.ext import commands
 
 from commands.utils import DatetimeConverter
-from data.interface import create_subscriber, delete_subscriber
+from data.asynchronous import create_subscriber, delete_subscriber
 
 
 class Premium(commands.Cog):
@@ -29,14 +29,14 @@ class Premium(commands.Cog):
                           datetime, DatetimeConverter
                       ],
                       name: str = None):
-        if not self.bot.is_owner(interaction.user):
+        if not await self.bot.is_owner(interaction.user):
             await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
             return
 
         if name is None:
             name = self.bot.get_guild(guild).name
 
-        _ = create_subscriber(guild, name, until, since)
+        _ = await create_subscriber(guild, name, since, until)
 
         await interaction.response.send_message(f"Guild {guild} subscribed until {until}")
 
@@ -44,11 +44,11 @@ class Premium(commands.Cog):
     @group.command(name="revoke")
     @app_commands.describe(guild="The guild whose licence to revoke")
     async def revoke(self, interaction: discord.Interaction, guild: int):
-        if not self.bot.is_owner(interaction.user):
+        if not await self.bot.is_owner(interaction.user):
             await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
             return
 
-        delete_subscriber(guild)
+        await delete_subscriber(guild)
 
         await interaction.response.send_message(f"Guild {guild} unsubscribed")
 
@@ -10,8 +10,10 @@ from commands.messages import embed_configuration_error, embed_permissions_error
     message_raid_now
 from commands.utils import is_guild_configured, is_user_organiser, DatetimeConverter, valid_user_discriminator
 from commands.view_raid import RaidView, ClashView
-from data.interface import create_raid, update_raid, get_raid_supports, get_raid_leaders, get_raid_backup_leaders
+from data.asynchronous import create_raid, update_raid, read_raid_roster
+from data.interface import RaidRoster
 from data.models import Raid as RaidModel
+from system.dispatcher import Priority
 
 from commands.cog_config import Role as ConfigRole
 
@@ -118,7 +120,7 @@ class Starverse(Raid):
         description = description or f"Organised by <@{interaction.user.id}>"
         description += f"\nHappens on {format_timestamp(happens_on.timestamp(), TimestampType.LONG_DATETIME)}.\n Apply by {format_timestamp(apply_by.timestamp(), TimestampType.LONG_DATETIME)} ({format_timestamp(apply_by.timestamp(), TimestampType.RELATIVE)}).\n"
 
-        raid: RaidModel = create_raid(i_guild=interaction.guild.id, i_user=interaction.user.id, s_title=title, s_description=description, d_apply_by=apply_by, d_happens_on=happens_on)
+        raid: RaidModel = await create_raid(i_guild=interaction.guild.id, i_user=interaction.user.id, s_title=title, s_description=description, d_apply_by=apply_by, d_happens_on=happens_on)
 
         embed = discord.Embed(title=title, description=description, color=discord.Color.from_str(f"#{c_hex}"))
         embed.set_thumbnail(url=thumbnail)
@@ -126,7 +128,7 @@ class Starverse(Raid):
         embed.set_footer(text=f"Raid: {raid.id}")
 
         await interaction.response.send_message(f"Created raid `{raid.id}`", ephemeral=True)
-        message = await interaction.channel.send(embed=embed)
+        message = await self.bot.outbound.send(interaction.channel, Priority.Interaction, embed=embed)
 
         view = RaidView(user=interaction.user, raid_id=raid.id, message=message,
                         timeout=apply_by.timestamp() - datetime.now().timestamp())
@@ -137,7 +139,7 @@ class Starverse(Raid):
             self.bot.schedule_message(channel_id=message.channel.id, text=message_raid_starting_in(raid, ping), when=warning)
             self.bot.schedule_message(channel_id=message.channel.id, text=message_raid_now(raid, ping), when=happens_on)
 
-        await message.edit(view=view)
+        await self.bot.outbound.edit(message, Priority.Interaction, view=view)
 
 
     async def close(self, interaction: discord.Interaction, message: discord.Message):
@@ -156,7 +158,7 @@ class Starverse(Raid):
 
             if embed.footer.text.startswith("Raid:"):
                 r_id = int(embed.footer.text.replace("Raid:", "").strip())
-                _ = update_raid(i_raid=r_id, d_apply_by=datetime.now())
+                _ = await update_raid(i_raid=r_id, d_apply_by=datetime.now())
 
                 await message.edit(view=None)
                 await interaction.response.send_message(f"Sign-ups for raid #{r_id} were closed successfully.")
@@ -182,9 +184,10 @@ class Starverse(Raid):
             if embed.footer.text.startswith("Raid:"):
                 raid_id = int(embed.footer.text.replace("Raid:", "").strip())
 
-                leaders: list[int] | None = get_raid_leaders(raid_id)
-                backups: list[int] | None = get_raid_backup_leaders(raid_id)
-                supports: list[int] | None = get_raid_supports(raid_id)
+                roster: RaidRoster = await read_raid_roster(raid_id)
+                leaders: list[int] = roster.ordered(roster.leaders)
+                backups: list[int] = roster.ordered(roster.backup_leaders)
+                supports: list[int] = roster.ordered(roster.supports)
 
                 s_leaders: list[str] = [valid_user_discriminator(interaction.guild.get_member(leader)) for leader in leaders]
                 s_backups: list[str] = [valid_user_discriminator(interaction.guild.get_member(backup)) for backup in backups]
@@ -192,7 +195,7 @@ class Starverse(Raid):
 
                 text = ""
 
-                if backups is None:
+                if len(backups) == 0:
                     text = f"# Raid#{raid_id}\nLeader(s): " + ", ".join(s_leaders) + "\nSupport(s): " + ", ".join(s_supports)
                 else:
                     text = f"# Raid#{raid_id}\nLeader(s): " + ", ".join(s_leaders) + "\nBackup(s): " + ", ".join(s_backups) + "\nSupport(s): " + ", ".join(s_supports)
@@ -216,8 +219,9 @@ class Starverse(Raid):
             await interaction.response.send_message(embed=embed_permissions_error(guild, ConfigRole.OrganiserRole), ephemeral=True)
             return
 
-        leaders: list[int] | None = get_raid_leaders(raid_id)
-        supports: list[int] | None = get_raid_supports(raid_id)
+        roster: RaidRoster = await read_raid_roster(raid_id)
+        leaders: list[int] = roster.ordered(roster.leaders)
+        supports: list[int] = roster.ordered(roster.supports)
 
         s_leaders: list[str] = [valid_user_discriminator(interaction.guild.get_member(leader)) for leader in leaders]
         s_supports: list[str] = [valid_user_discriminator(interaction.guild.get_member(support)) for support in supports]
@@ -271,7 +275,7 @@ class Kunlun(Raid):
         description = description or f"Organised by <@{interaction.user.id}>"
         description += f"\nHappens on {format_timestamp(happens_on.timestamp(), TimestampType.LONG_DATETIME)}.\n Apply by {format_timestamp(apply_by.timestamp(), TimestampType.LONG_DATETIME)} ({format_timestamp(apply_by.timestamp(), TimestampType.RELATIVE)}).\n"
 
-        raid: RaidModel = create_raid(i_guild=interaction.guild.id, i_user=interaction.user.id, s_title=title,
+        raid: RaidModel = await create_raid(i_guild=interaction.guild.id, i_user=interaction.user.id, s_title=title,
                                       s_description=description, d_apply_by=apply_by, d_happens_on=happens_on)
 
         embed = discord.Embed(title=title, description=description, color=discord.Color.from_str(f"#{c_hex}"))
@@ -280,7 +284,7 @@ class Kunlun(Raid):
         embed.set_footer(text=f"Raid: {raid.id}")
 
         await interaction.response.send_message(f"Created raid `{raid.id}`", ephemeral=True)
-        message = await interaction.channel.send(embed=embed)
+        message = await self.bot.outbound.send(interaction.channel, Priority.Interaction, embed=embed)
 
         view = RaidView(user=interaction.user, raid_id=raid.id, message=message,
                         timeout=apply_by.timestamp() - datetime.now().timestamp())
@@ -291,7 +295,7 @@ class Kunlun(Raid):
             self.bot.schedule_message(channel_id=message.channel.id, text=message_raid_starting_in(raid, ping), when=warning)
             self.bot.schedule_message(channel_id=message.channel.id, text=message_raid_now(raid, ping), when=happens_on)
 
-        await message.edit(view=view)
+        await self.bot.outbound.edit(message, Priority.Interaction, view=view)
 
     @group.command(name="list", description="List subscribers for kunlun")
     @app_commands.describe(raid_id="Raid id")
@@ -307,8 +311,9 @@ class Kunlun(Raid):
             await interaction.response.send_message(embed=embed_permissions_error(guild, ConfigRole.OrganiserRole), ephemeral=True)
             return
 
-        leaders: list[int] | None = get_raid_leaders(raid_id)
-        supports: list[int] | None = get_raid_supports(raid_id)
+        roster: RaidRoster = await read_raid_roster(raid_id)
+        leaders: list[int] = roster.ordered(roster.leaders)
+        supports: list[int] = roster.ordered(roster.supports)
 
         s_leaders: list[str] = [valid_user_discriminator(interaction.guild.get_member(leader)) for leader in leaders]
         s_supports: list[str] = [valid_user_discriminator(interaction.guild.get_member(support)) for support in supports]
@@ -357,14 +362,14 @@ class Clash(Raid):
         description = description or f"Organised by <@{interaction.user.id}>"
         description += f"\nHappens on {format_timestamp(happens_on.timestamp(), TimestampType.LONG_DATETIME)}.\n Apply by {format_timestamp(apply_by.timestamp(), TimestampType.LONG_DATETIME)} ({format_timestamp(apply_by.timestamp(), TimestampType.RELATIVE)}).\n"
 
-        raid: RaidModel = create_raid(i_guild=interaction.guild.id, i_user=interaction.user.id, s_title=title,
+        raid: RaidModel = await create_raid(i_guild=interaction.guild.id, i_user=interaction.user.id, s_title=title,
                                       s_description=description, d_apply_by=apply_by, d_happens_on=happens_on)
 
         embed = discord.Embed(title=title, description=description, color=discord.Color.random())
         embed.set_footer(text=f"Raid: {raid.id}")
 
         await interaction.response.send_message(f"Created raid `{raid.id}`", ephemeral=True)
-        message = await interaction.channel.send(content="Incoming raid...")
+        message = await self.bot.outbound.send(interaction.channel, Priority.Interaction, content="Incoming raid...")
 
         view = ClashView(user=interaction.user, raid_id=raid.id, message=message, arrays=arrays,
                         timeout=apply_by.timestamp() - datetime.now().timestamp())
@@ -375,7 +380,7 @@ class Clash(Raid):
             self.bot.schedule_message(channel_id=message.channel.id, text=message_raid_starting_in(raid, ping), when=warning)
             self.bot.schedule_message(channel_id=message.channel.id, text=message_raid_now(raid, ping), when=happens_on)
 
-        await message.edit(embed=embed, view=view)
+        await self.bot.outbound.edit(message, Priority.Interaction, embed=embed, view=view)
 
     @group.command(name="list", description="List subscribers for sect clash")
     @app_commands.describe(raid_id="Raid id")
@@ -391,9 +396,10 @@ class Clash(Raid):
             await interaction.response.send_message(embed=embed_permissions_error(guild, ConfigRole.OrganiserRole), ephemeral=True)
             return
 
-        leaders: list[int] | None = get_raid_leaders(raid_id)
-        backups: list[int] | None = get_raid_backup_leaders(raid_id)
-        supports: list[int] | None = get_raid_supports(raid_id)
+        roster: RaidRoster = await read_raid_roster(raid_id)
+        leaders: list[int] = roster.ordered(roster.leaders)
+        backups: list[int] = roster.ordered(roster.backup_leaders)
+        supports: list[int] = roster.ordered(roster.supports)
 
         s_leaders: list[str] = [valid_user_discriminator(interaction.guild.get_member(leader)) for leader in leaders]
         s_backups: list[str] = [valid_user_discriminator(interaction.guild.get_member(backup)) for backup in backups]
@@ -1,14 +1,26 @@
+import asyncio
+import os
+import tempfile
+import time
 from datetime import datetime
 
 import discord
 from apscheduler.job import Job
 from discord import app_commands
 from discord.ext import commands
+from discord_timestamps import format_timestamp, TimestampType
 
 from commands.cog_config import Role
+from commands.filters import event_filter
 from commands.messages import embed_configuration_error, embed_permissions_error, embed_scheduled_message, \
-    message_scheduled_jobs, messages_scheduled_jobs
-from commands.utils import is_guild_configured, is_user_organiser, DatetimeConverter
+    embed_log_results, message_scheduled_jobs, messages_scheduled_jobs
+from commands.utils import is_guild_configured, is_user_organiser, is_user_warden, DatetimeConverter, \
+    PastDatetimeConverter
+from data.asynchronous import run
+from data.backup import last_backups
+from data.interface import guild_cache
+from data.transfer import TABLES, FORMATS, export_table
+from system.dispatcher import Priority
 
 class Scheduler(commands.Cog):
     group = app_commands.Group(name="schedule", description="Scheduler commands")
@@ -35,7 +47,7 @@ class Scheduler(commands.Cog):
         messages = messages_scheduled_jobs(interaction, jobs)
         await interaction.edit_original_response(content=messages[0])
         for message in messages[1:]:
-            await interaction.channel.send(message)
+            await self.bot.outbound.send(interaction.channel, Priority.Interaction, content=message)
 
 
     @group.command(name="remove", description="Remove a scheduled job")
@@ -98,5 +110,183 @@ class Scheduler(commands.Cog):
         await interaction.response.send_message(embed=embed_scheduled_message(message, when=job.next_run_time), ephemeral=True)
 
 
+class Diagnostics(commands.Cog):
+    group = app_commands.Group(name="diagnostics", description="Diagnostics commands")
+
+    def __init__(self, bot):
+        self.bot = bot
+
+
+    @group.command(name="cache", description="Show guild configuration cache statistics")
+    async def cache(self, interaction: discord.Interaction):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
+            return
+
+        stats = guild_cache.stats()
+        await interaction.response.send_message(
+            content=f"Guilds cached: `{stats['size']}`\nHits: `{stats['hits']}`\nMisses: `{stats['misses']}`",
+            ephemeral=True
+        )
+
+
+    @group.command(name="backup", description="Show the most recent database backups")
+    async def backup(self, interaction: discord.Interaction):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
+            return
+
+        if len(last_backups) == 0:
+            await interaction.response.send_message(content="No backup has run yet.", ephemeral=True)
+            return
+
+        lines = [f"`{report.source}`: {report.size} bytes in {report.duration:.2f}s "
+                 f"({format_timestamp(report.finished_at.timestamp(), TimestampType.RELATIVE)})"
+                 for report in last_backups.values()]
+        await interaction.response.send_message(content="\n".join(lines), ephemeral=True)
+
+
+    @group.command(name="logs", description="Show audit log delivery statistics")
+    async def logs(self, interaction: discord.Interaction):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
+            return
+
+        stats = self.bot.courier.stats()
+        store = self.bot.message_store.stats()
+        attachments = self.bot.attachment_archive.stats() if self.bot.attachment_archive is not None else None
+        await interaction.response.send_message(
+            content=f"Embeds delivered: `{stats['embeds']}`\nMessages sent: `{stats['messages']}`\n"
+                    f"Failed sends: `{stats['failures']}`\nPending: `{stats['pending']}`\n"
+                    f"Messages stored: `{store['rows']}`/`{store['max_rows']}` ({store['evicted']} evicted, {store['dropped']} dropped)"
+                    + (f"\nAttachments: `{attachments['stored']}` stored, `{attachments['deduplicated']}` deduplicated, "
+                       f"`{attachments['skipped']}` skipped, `{attachments['failed']}` failed"
+                       if attachments is not None else ""),
+            ephemeral=True
+        )
+
+
+    @group.command(name="events", description="Show how many gateway events were accepted or dropped")
+    async def events(self, interaction: discord.Interaction):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
+            return
+
+        lines = [f"`{event}`: " + ", ".join(f"{verdict} {count}" for verdict, count in verdicts.items())
+                 for event, verdicts in event_filter.stats().items()]
+        await interaction.response.send_message(content="\n".join(lines) or "No events yet.", ephemeral=True)
+
+
+    @group.command(name="model", description="Show the state of the embedding model")
+    async def model(self, interaction: discord.Interaction):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
+            return
+
+        stats = self.bot.embedder.stats()
+        loaded = f" in {stats['load_time']:.2f}s" if stats['load_time'] is not None else ""
+        await interaction.response.send_message(
+            content=f"Model `{stats['model']}` is {stats['state']}{loaded}\n"
+                    f"Encoded `{stats['encoded']}` text(s) in `{stats['batches']}` batch(es), `{stats['pending']}` pending",
+            ephemeral=True
+        )
+
+
+    @group.command(name="outbound", description="Show outbound queue depth and wait times")
+    async def outbound(self, interaction: discord.Interaction):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
+            return
+
+        stats = self.bot.outbound.stats()
+        lines = [f"`{name}`: {s['depth']} queued, {s['sent']} sent, {s['failed']} failed, "
+                 f"wait avg {s['wait_avg'] * 1000:.0f}ms / max {s['wait_max'] * 1000:.0f}ms"
+                 for name, s in stats['priorities'].items()]
+        lines.append(f"Rate limited: `{stats['rate_limited']}`")
+        await interaction.response.send_message(content="\n".join(lines), ephemeral=True)
+
+
+class Logs(commands.Cog):
+    group = app_commands.Group(name="logs", description="Moderation log commands")
+
+    def __init__(self, bot):
+        self.bot = bot
+
+
+    @group.command(name="search", description="Search the moderation log archive")
+    @app_commands.describe(text="Words to look for")
+    @app_commands.describe(user="Only entries about this user")
+    @app_commands.describe(channel="Only entries from this channel")
+    @app_commands.describe(since="Only entries after this date")
+    @app_commands.describe(until="Only entries before this date")
+    async def search(self, interaction: discord.Interaction,
+                     text: str = None,
+                     user: discord.User = None,
+                     channel: discord.TextChannel = None,
+                     since: app_commands.Transform[datetime, PastDatetimeConverter] = None,
+                     until: app_commands.Transform[datetime, PastDatetimeConverter] = None):
+        guild, is_configured = is_guild_configured(interaction.guild.id)
+
+        if not is_configured:
+            await interaction.response.send_message(embed=embed_configuration_error(guild), ephemeral=True)
+            return
+
+        if not is_user_warden(guild, interaction.user):
+            await interaction.response.send_message(embed=embed_permissions_error(guild, Role.WardenRole), ephemeral=True)
+            return
+
+        started = time.perf_counter()
+        entries = await asyncio.to_thread(
+            self.bot.log_archive.search,
+            interaction.guild.id,
+            s_text=text,
+            i_user=user.id if user is not None else None,
+            i_channel=channel.id if channel is not None else None,
+            i_since=int(since.timestamp()) if since is not None else None,
+            i_until=int(until.timestamp()) if until is not None else None
+        )
+
+        await interaction.response.send_message(
+            embed=embed_log_results(entries, time.perf_counter() - started), ephemeral=True
+        )
+
+
+class Transfer(commands.Cog):
+    group = app_commands.Group(name="data", description="Data transfer commands")
+
+    def __init__(self, bot):
+        self.bot = bot
+
+
+    @group.command(name="export", description="Export a table as a compressed file")
+    @app_commands.describe(table="The table to export")
+    @app_commands.describe(format="The file format")
+    @app_commands.choices(
+        table=[app_commands.Choice(name=name, value=name) for name in TABLES.keys()],
+        format=[app_commands.Choice(name=name, value=name) for name in FORMATS]
+    )
+    async def export(self, interaction: discord.Interaction, table: str, format: str = "jsonl"):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("You are not authorised to run this command!", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+
+        descriptor, path = tempfile.mkstemp(suffix=f".{format}.gz")
+        os.close(descriptor)
+
+        try:
+            count = await run(export_table, table, format, path)
+            await interaction.edit_original_response(
+                content=f"Exported {count} row(s) of `{table}`.",
+                attachments=[discord.File(path, filename=f"{table}.{format}.gz")]
+            )
+        finally:
+            os.remove(path)
+
+
 async def setup(bot):
     await bot.add_cog(Scheduler(bot))
+    await bot.add_cog(Diagnostics(bot))
+    await bot.add_cog(Logs(bot))
+    await bot.add_cog(Transfer(bot))
@@ -0,0 +1,102 @@
+import enum
+
+from collections import Counter
+
+from data.interface import guild_cache
+from data.messages import StoredMessage
+
+
+class Verdict(str, enum.Enum):
+    Accepted = "accepted"
+    DirectMessage = "direct_message"
+    Unconfigured = "unconfigured"
+    IgnoredChannel = "ignored_channel"
+    Bot = "bot"
+    Unchanged = "unchanged"
+
+
+class EventFilter:
+    counters: Counter
+
+    def __init__(self):
+        self.counters = Counter()
+
+    def _record(self, s_event: str, e_verdict: Verdict) -> bool:
+        self.counters[(s_event, e_verdict)] += 1
+
+        return e_verdict == Verdict.Accepted
+
+    def _guild_verdict(self, i_guild: int | None, i_channel: int | None) -> Verdict:
+        if i_guild is None:
+            return Verdict.DirectMessage
+
+        wrap = guild_cache.get(i_guild)
+
+        # a cache miss is left for the handler to resolve, it never drops an event on its own
+        if wrap is None:
+            return Verdict.Accepted
+
+        if 'log_channel' not in wrap.configuration:
+            return Verdict.Unconfigured
+
+        if i_channel in wrap.configuration.get('ignored_channels', ()):
+            return Verdict.IgnoredChannel
+
+        return Verdict.Accepted
+
+    def message(self, message) -> bool:
+        verdict = self._guild_verdict(message.guild.id if message.guild else None, message.channel.id)
+
+        if verdict == Verdict.Accepted and message.author.bot:
+            verdict = Verdict.Bot
+
+        return self._record("message", verdict)
+
+    def edit(self, payload) -> bool:
+        verdict = self._guild_verdict(payload.guild_id, payload.channel_id)
+        data = payload.data
+        cached = payload.cached_message
+
+        if verdict != Verdict.Accepted:
+            pass
+        elif data.get('author', {}).get('bot', False):
+            verdict = Verdict.Bot
+        elif ('content' not in data and 'attachments' not in data) or data.get('edited_timestamp') is None:
+            # link previews and other embed-only updates never set edited_timestamp
+            verdict = Verdict.Unchanged
+        elif cached is not None and cached.content == data.get('content', cached.content) \
+                and [a.id for a in cached.attachments] == [int(a['id']) for a in data.get('attachments', ())]:
+            verdict = Verdict.Unchanged
+
+        return self._record("edit", verdict)
+
+    def edited(self, before: StoredMessage, after: StoredMessage) -> bool:
+        # second look once an uncached message was recalled from the store
+        if not before.author_bot and (before.content != after.content or before.attachments != after.attachments):
+            return True
+
+        self.counters[("edit", Verdict.Accepted)] -= 1
+
+        return self._record("edit", Verdict.Bot if before.author_bot else Verdict.Unchanged)
+
+    def delete(self, i_guild: int | None, i_channel: int, cached=None) -> bool:
+        verdict = self._guild_verdict(i_guild, i_channel)
+
+        if verdict == Verdict.Accepted and cached is not None and cached.author.bot:
+            verdict = Verdict.Bot
+
+        return self._record("delete", verdict)
+
+    def member(self, i_guild: int) -> bool:
+        return self._record("member", self._guild_verdict(i_guild, None))
+
+    def stats(self) -> dict:
+        stats = {}
+
+        for (event, verdict), count in self.counters.items():
+            stats.setdefault(event, {})[verdict.value] = count
+
+        return stats
+
+
+event_filter = EventFilter()
@@ -2,14 +2,16 @@ from datetime import datetime
 
 import discord
 from apscheduler.job import Job
-from discord import Embed, Color, Member, Message, Role
+from discord import Embed, Color, Member, Role
 from discord_timestamps import format_timestamp, TimestampType
 from requests import Response
 from table2ascii import table2ascii as t2a, PresetStyle
 
 from commands.cog_config import Role as ConfigRole
-from commands.utils import display_sudoku
+from commands.utils import diff_words, display_sudoku
 from data.interface import read_raid
+from data.logs import LogEntry
+from data.messages import StoredMessage
 from data.models import Guild, Raid, Riddle
 
 
@@ -38,16 +40,16 @@ def embed_member_leave_guild(member: Member):
     return embed
 
 
-def embed_message_delete(message: Message):
+def embed_message_delete(message: StoredMessage):
     attachments = []
 
-    embed = Embed(color=Color.red(), title=f"A message was deleted by {message.author.name}")
+    embed = Embed(color=Color.red(), title=f"A message was deleted by {message.author_name}")
     embed.description = (f"**Original message follows**\n"
                          f"{message.content}\n\n"
-                         f"-# Sent at {message.created_at}\n"
+                         f"-# Sent at {message.created}\n"
                          f"-------\n"
-                         f"**User**: {message.author.mention} ({message.author.name})\n"
-                         f"**Channel**: {message.channel.mention} ({message.channel.name})\n"
+                         f"**User**: {message.author_mention} ({message.author_name})\n"
+                         f"**Channel**: {message.channel_mention}\n"
                          f"**Context**: {message.jump_url}\n"
                          f"-------\n"
                          f"*Attachments may follow*")
@@ -71,17 +73,17 @@ def embed_permissions_error(guild: Guild, role: ConfigRole):
     return embed
 
 
-def embeds_message_edit(before: Message, after: Message):
+def embeds_message_edit(before: StoredMessage, after: StoredMessage):
     b_attachments = []
 
     b_embed = Embed(color=Color.purple(),
-                  title=f"A message was edited by {before.author.name}")
+                  title=f"A message was edited by {before.author_name}")
     b_embed.description = (f"**Original message follows**\n"
                          f"{before.content}\n\n"
-                         f"-# Sent at {before.created_at}\n"
+                         f"-# Sent at {before.created}\n"
                          f"-------\n"
-                         f"**User**: {before.author.mention} ({before.author.name})\n"
-                         f"**Channel**: {before.channel.mention} ({before.channel.name})\n"
+                         f"**User**: {before.author_mention} ({before.author_name})\n"
+                         f"**Channel**: {before.channel_mention}\n"
                          f"**Context**: {before.jump_url}\n"
                          f"-------\n"
                          f"*Attachments may follow*")
@@ -119,6 +121,44 @@ def embeds_message_edit(before: Message, after: Message):
     return b_embed, b_attachments, a_embed, a_attachments
 
 
+def embed_message_edit_diff(before: StoredMessage, after: StoredMessage):
+    attachments = []
+
+    embed = Embed(color=Color.purple(), title=f"A message was edited by {before.author_name}")
+    details = (f"\n\n-# Sent at {before.created}\n"
+               f"-------\n"
+               f"**User**: {before.author_mention} ({before.author_name})\n"
+               f"**Channel**: {before.channel_mention}\n"
+               f"**Context**: {before.jump_url}")
+
+    diff = diff_words(before.content, after.content) if before.content != after.content else "*Text unchanged*"
+
+    if len(diff) + len(details) > 4096:
+        diff = diff[:4096 - len(details) - 1] + "…"
+
+    embed.description = diff + details
+
+    removed = [attachment for attachment in before.attachments if attachment not in after.attachments]
+
+    if len(removed) > 0:
+        embed.add_field(name="Removed attachments", value="\n".join(a.filename for a in removed)[:1024], inline=False)
+
+    for attachment in after.attachments:
+        if attachment in before.attachments:
+            continue
+
+        att_embed = Embed(color=Color.greyple(), title=f"{attachment.filename}")
+
+        if (attachment.content_type == "image/png" or attachment.content_type == "image/jpeg"
+                or attachment.content_type == "image/webp" or attachment.content_type == "image/gif"):
+            att_embed.set_image(url=attachment.url)
+
+        att_embed.description = attachment.url
+        attachments.append(att_embed)
+
+    return embed, attachments
+
+
 def message_imprisonment(riddle: Riddle, member: Member):
     return (f"## Welcome to the Dungeon <@!{member.id}> 😏\n"
             f"### Solve the following riddle to get out.\n"
@@ -187,7 +227,7 @@ def p_embed_kofi(data):
 def message_raid_starting_in(raid: Raid, ping: Role):
     message = (f"## {raid.title} starting in 1 hour!\n"
                f"Don't forget to participate! <@&{ping.id}>\n"
-               f"-# Raid#{raid.id} happening on {format_timestamp(datetime.fromisoformat(raid.happens_on).timestamp(), TimestampType.LONG_DATETIME)}.")
+               f"-# Raid#{raid.id} happening on {format_timestamp(raid.happens_on, TimestampType.LONG_DATETIME)}.")
     return message
 
 def message_raid_now(raid: Raid, ping: Role):
@@ -196,6 +236,30 @@ def message_raid_now(raid: Raid, ping: Role):
     return message
 
 
+def embed_premium_error():
+    embed = Embed(color=Color.red(), title=f"This guild has no active licence!")
+    embed.description = "This command is only available to premium guilds."
+    return embed
+
+
+def embed_log_results(entries: list[LogEntry], elapsed: float):
+    embed = Embed(color=Color.greyple(), title=f"Log search")
+    embed.description = f"{len(entries)} match(es) in {elapsed * 1000:.1f}ms"
+
+    for entry in entries:
+        text = entry.content if entry.before is None else f"~~{entry.before}~~ → {entry.content}"
+        where = f" in <#{entry.channel_id}>" if entry.channel_id is not None else ""
+
+        embed.add_field(
+            name=f"{entry.kind.value.capitalize()} by {entry.user_name}",
+            value=f"{text[:300] or '-'}\n-# <@{entry.user_id}>{where}, "
+                  f"{format_timestamp(entry.created_at, TimestampType.RELATIVE)}",
+            inline=False
+        )
+
+    return embed
+
+
 def embed_scheduled_message(message: str, when: datetime):
     title = f"Message scheduled"
     embed = Embed(color=Color.greyple(), title=f"{title}")
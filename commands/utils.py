@@ -1,3 +1,6 @@
+import difflib
+import re
+
 import dateparser
 from datetime import datetime
 
@@ -5,7 +8,7 @@ import discord
 from discord import Member, app_commands, User
 from discord.ext import commands
 
-from data.interface import GuildWrapper, create_guild
+from data.interface import GuildWrapper, create_guild, licence_index
 from data.models import Guild
 
 
@@ -16,6 +19,24 @@ def is_guild_configured(guild_id: int) -> tuple[Guild, bool]:
     return guild, is_not_none
 
 
+def is_guild_premium(guild_id: int) -> bool:
+    return licence_index.is_premium(guild_id)
+
+
+class PremiumRequired(app_commands.CheckFailure):
+    pass
+
+
+def premium_only():
+    async def predicate(interaction: discord.Interaction) -> bool:
+        if interaction.guild is None or not is_guild_premium(interaction.guild.id):
+            raise PremiumRequired("This command requires a premium licence")
+
+        return True
+
+    return app_commands.check(predicate)
+
+
 def is_user_imprisoned(guild: Guild, member: Member) -> bool:
     return any(role.id == guild.configuration['inmate_role'] for role in member.roles)
 
@@ -78,6 +99,47 @@ def display_sudoku(grid) -> str:
     return '\n'.join(lines)
 
 
+def _mark(text: str, marker: str) -> str:
+    # markdown spans cannot cross line breaks, so every line is wrapped on its own
+    return "\n".join(f"{marker}{discord.utils.escape_markdown(line)}{marker[::-1]}" if line.strip() else line
+                     for line in text.split("\n"))
+
+
+def diff_words(before: str, after: str, context: int = 8) -> str:
+    # whitespace runs are kept as tokens so the rendered text keeps its line breaks
+    a = re.split(r"(\s+)", before)
+    b = re.split(r"(\s+)", after)
+    opcodes = difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+    parts = []
+
+    for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == "equal":
+            same = a[i1:i2]
+            keep = 2 * context
+
+            if index == 0 and len(same) > keep:
+                same = ["… "] + same[-keep:]
+            elif index == len(opcodes) - 1 and len(same) > keep:
+                same = same[:keep] + [" …"]
+            elif len(same) > 2 * keep:
+                same = same[:keep] + [" … "] + same[-keep:]
+
+            parts.append(discord.utils.escape_markdown("".join(same)))
+            continue
+
+        removed = "".join(a[i1:i2]).strip()
+        added = "".join(b[j1:j2]).strip()
+
+        if removed:
+            parts.append(_mark(removed, "~~"))
+        if removed and added:
+            parts.append(" ")
+        if added:
+            parts.append(_mark(added, "__**"))
+
+    return "".join(parts)
+
+
 def valid_user_discriminator(user: Member | User):
     if isinstance(user, Member):
         user: Member = user
@@ -94,6 +156,19 @@ class DatetimeConverter(app_commands.Transformer):
         try:
             date = dateparser.parse(argument, settings={"PREFER_DATES_FROM": "future"})
 
+            if date is None:
+                raise ValueError
+
+            return date
+        except ValueError:
+            raise commands.BadArgument(f"Invalid date: {argument}")
+
+
+class PastDatetimeConverter(app_commands.Transformer):
+    async def transform(self, interaction: discord.Interaction, argument: str) -> datetime:
+        try:
+            date = dateparser.parse(argument, settings={"PREFER_DATES_FROM": "past"})
+
             if date is None:
                 raise ValueError
 
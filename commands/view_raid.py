@@ -13,14 +13,17 @@ from discord.ui.select import BaseSelect
 
 from commands.messages import embed_configuration_error
 from commands.utils import is_user_member, is_guild_configured
-from data.interface import get_raid_supports, read_raid, set_raid_supports, \
-    set_raid_leaders, get_raid_leaders, set_raid_backup_leaders, get_raid_backup_leaders
-from data.models import Raid
+from data.asynchronous import read_raid_roster, toggle_raid_participant
+from data.database import QueryCounter, count_queries
+from data.interface import RaidConflict, RaidRoster, SignUp
+from data.models import Raid, ParticipantRole
+from system.dispatcher import Priority
 
 
 class BaseView(discord.ui.View):
     interaction: discord.Interaction | None = None
     message: discord.Message | None = None
+    queries: QueryCounter | None = None
 
     def __init__(self, user: discord.User | discord.Member, timeout: float = 60.0):
         super().__init__(timeout=timeout)
@@ -33,6 +36,8 @@ class BaseView(discord.ui.View):
             return False
         # update the interaction attribute when a valid interaction is received
         self.interaction = interaction
+        # count the queries issued while this interaction is processed
+        self.queries = count_queries()
         return True
 
     # to handle errors we first notify the user that an error has occurred and then disable all components
@@ -79,9 +84,10 @@ class BaseView(discord.ui.View):
 
 class RaidView(BaseView):
     async def change_embed(self):
-        raid: Raid = read_raid(int(self.raid_id))
-        leaders: list[int] = get_raid_leaders(int(self.raid_id))
-        supports: list[int] = get_raid_supports(int(self.raid_id))
+        roster: RaidRoster = await read_raid_roster(int(self.raid_id))
+        raid: Raid = roster.raid
+        leaders: list[int] = roster.ordered(roster.leaders)
+        supports: list[int] = roster.ordered(roster.supports)
 
         old_embed = self.original.embeds[0]
 
@@ -101,7 +107,7 @@ class RaidView(BaseView):
         new_embed.set_image(url=old_embed.image.url)
         new_embed.set_footer(text=f"Raid: {raid.id}")
 
-        await self.original.edit(embed=new_embed, view=self)
+        await self.interaction.client.outbound.edit(self.original, Priority.RaidEdit, embed=new_embed, view=self)
 
     def __init__(self, user: discord.User | discord.Member, raid_id: int, message: discord.Message, timeout: float = 60.0):
         super().__init__(user, timeout)
@@ -119,18 +125,28 @@ class RaidView(BaseView):
                 await interaction.response.send_message(f"You're not a member!", ephemeral=True)
                 return
 
-            leaders: list[int] | None = get_raid_leaders(int(interaction.data['custom_id'].split(":")[1]))
-            supports: list[int] | None = get_raid_supports(int(interaction.data['custom_id'].split(":")[1]))
+            try:
+                result = await toggle_raid_participant(self.raid_id, interaction.user.id, ParticipantRole.Leader, 1)
+            except RaidConflict:
+                await interaction.response.send_message(f"Too many sign-ups at once, please retry.", ephemeral=True)
+                return
 
-            if supports is not None and interaction.user.id in supports:
+            if result == SignUp.Taken:
                 await interaction.response.send_message(f"You registered as support for this raid.", ephemeral=True)
                 return
 
-            if leaders is not None and len(leaders) > 0 and interaction.user.id not in leaders:
+            if result == SignUp.Full:
+                roster: RaidRoster = await read_raid_roster(self.raid_id)
+                leaders: list[int] = roster.ordered(roster.leaders)
+
+                # the leader may have left between the toggle and this read
+                if len(leaders) == 0:
+                    await interaction.response.send_message(f"The leader slot just opened up, please apply again.", ephemeral=True)
+                    return
+
                 await interaction.response.send_message(f"<@{leaders[0]}> is already registered as leader for this raid.", ephemeral=True)
                 return
 
-            set_raid_leaders(self.raid_id, [interaction.user.id])
             await interaction.response.send_message(f"You un/registered as leader for this raid.", ephemeral=True)
             await self.change_embed()
 
@@ -145,18 +161,20 @@ class RaidView(BaseView):
                 await interaction.response.send_message(f"You're not a member!", ephemeral=True)
                 return
 
-            leaders: list[int] | None = get_raid_leaders(int(interaction.data['custom_id'].split(":")[1]))
-            supports: list[int] | None = get_raid_supports(int(interaction.data['custom_id'].split(":")[1]))
+            try:
+                result = await toggle_raid_participant(self.raid_id, interaction.user.id, ParticipantRole.Support, 19)
+            except RaidConflict:
+                await interaction.response.send_message(f"Too many sign-ups at once, please retry.", ephemeral=True)
+                return
 
-            if leaders is not None and interaction.user.id in leaders:
+            if result == SignUp.Taken:
                 await interaction.response.send_message(f"You registered as leader for this raid.", ephemeral=True)
                 return
 
-            if supports is not None and len(supports) == 19 and interaction.user.id not in supports:
+            if result == SignUp.Full:
                 await interaction.response.send_message(f"Raid is already full, please try another time.", ephemeral=True)
                 return
 
-            set_raid_supports(self.raid_id, [interaction.user.id])
             await interaction.response.send_message(f"You un/registered as support for this raid.", ephemeral=True)
             await self.change_embed()
 
@@ -207,10 +225,11 @@ class RaidView(BaseView):
 
 class ClashView(BaseView):
     async def change_embed(self):
-        raid: Raid = read_raid(int(self.raid_id))
-        leaders: list[int] = get_raid_leaders(int(self.raid_id))
-        backups: list[int] = get_raid_backup_leaders(int(self.raid_id))
-        supports: list[int] = get_raid_supports(int(self.raid_id))
+        roster: RaidRoster = await read_raid_roster(int(self.raid_id))
+        raid: Raid = roster.raid
+        leaders: list[int] = roster.ordered(roster.leaders)
+        backups: list[int] = roster.ordered(roster.backup_leaders)
+        supports: list[int] = roster.ordered(roster.supports)
 
         list_leaders: str = "<@" + ">, <@".join(map(str, leaders)) + ">" if leaders is not None and len(leaders) > 0 else "None"
         list_backups: str = "<@" + ">, <@".join(map(str, backups)) + ">" if backups is not None and len(backups) > 0 else "None"
@@ -228,7 +247,7 @@ class ClashView(BaseView):
         new_embed.description = new_description
         new_embed.set_footer(text=f"Raid: {raid.id}")
 
-        await self.original.edit(embed=new_embed, view=self)
+        await self.interaction.client.outbound.edit(self.original, Priority.RaidEdit, embed=new_embed, view=self)
 
     def __init__(self, user: discord.User | discord.Member, raid_id: int, message: discord.Message, arrays: int = 3, timeout: float = 60.0):
         super().__init__(user, timeout)
@@ -247,19 +266,32 @@ class ClashView(BaseView):
                 await interaction.response.send_message(f"You're not a member!", ephemeral=True)
                 return
 
-            leaders: list[int] | None = get_raid_leaders(int(interaction.data['custom_id'].split(":")[1]))
-            supports: list[int] | None = get_raid_supports(int(interaction.data['custom_id'].split(":")[1]))
+            try:
+                result = await toggle_raid_participant(self.raid_id, interaction.user.id, ParticipantRole.Leader, arrays,
+                                                       (ParticipantRole.BackupLeader,))
+            except RaidConflict:
+                await interaction.response.send_message(f"Too many sign-ups at once, please retry.", ephemeral=True)
+                return
 
-            if supports is not None and interaction.user.id in supports:
+            if result == SignUp.Taken:
                 await interaction.response.send_message(f"You registered as support for this raid.", ephemeral=True)
                 return
 
-            if leaders is not None and len(leaders) == arrays and interaction.user.id not in leaders:
-                await interaction.response.send_message(f"Raid is already full, adding to backup drivers.", ephemeral=True)
-                set_raid_backup_leaders(self.raid_id, [interaction.user.id])
+            if result == SignUp.Full:
+                try:
+                    result = await toggle_raid_participant(self.raid_id, interaction.user.id, ParticipantRole.BackupLeader)
+                except RaidConflict:
+                    await interaction.response.send_message(f"Too many sign-ups at once, please retry.", ephemeral=True)
+                    return
+
+                if result == SignUp.Registered:
+                    await interaction.response.send_message(f"Raid is already full, adding to backup drivers.", ephemeral=True)
+                else:
+                    await interaction.response.send_message(f"You unregistered as backup driver for this raid.", ephemeral=True)
+
+                await self.change_embed()
                 return
 
-            set_raid_leaders(self.raid_id, [interaction.user.id])
             await interaction.response.send_message(f"You un/registered as driver for this raid.", ephemeral=True)
             await self.change_embed()
 
@@ -274,18 +306,20 @@ class ClashView(BaseView):
                 await interaction.response.send_message(f"You're not a member!", ephemeral=True)
                 return
 
-            leaders: list[int] | None = get_raid_leaders(int(interaction.data['custom_id'].split(":")[1]))
-            supports: list[int] | None = get_raid_supports(int(interaction.data['custom_id'].split(":")[1]))
+            try:
+                result = await toggle_raid_participant(self.raid_id, interaction.user.id, ParticipantRole.Support, 4*arrays)
+            except RaidConflict:
+                await interaction.response.send_message(f"Too many sign-ups at once, please retry.", ephemeral=True)
+                return
 
-            if leaders is not None and interaction.user.id in leaders:
+            if result == SignUp.Taken:
                 await interaction.response.send_message(f"You registered as driver for this raid.", ephemeral=True)
                 return
 
-            if supports is not None and len(supports) == 4*arrays and interaction.user.id not in supports:
+            if result == SignUp.Full:
                 await interaction.response.send_message(f"Raid is already full, please try another time.", ephemeral=True)
                 return
 
-            set_raid_supports(self.raid_id, [interaction.user.id])
             await interaction.response.send_message(f"You un/registered as support for this raid.", ephemeral=True)
             await self.change_embed()
 
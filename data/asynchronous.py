@@ -0,0 +1,123 @@
+import asyncio
+import contextvars
+import functools
+
+from concurrent.futures import ThreadPoolExecutor
+
+from data import database, interface
+from data.writer import WriteQueue
+
+executor: ThreadPoolExecutor | None = None
+write_queue: WriteQueue | None = None
+
+
+def start(workers: int = 4):
+    global executor
+
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bai-data")
+
+
+def start_group_commit(window_ms: float = 5, max_batch: int = 64):
+    global write_queue
+
+    if write_queue is None:
+        write_queue = WriteQueue(run, window=window_ms / 1000, max_batch=max_batch)
+        write_queue.start()
+
+
+async def stop_group_commit():
+    global write_queue
+
+    if write_queue is not None:
+        await write_queue.close()
+        write_queue = None
+
+
+def shutdown():
+    global executor
+
+    if executor is not None:
+        executor.shutdown(wait=True)
+        executor = None
+
+
+def _call(func, args, kwargs):
+    with database.connection():
+        return func(*args, **kwargs)
+
+
+async def run(func, *args, **kwargs):
+    # peewee keeps connection state per thread, so every call takes its worker's connection for its duration
+    start()
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+
+    return await loop.run_in_executor(executor, functools.partial(context.run, _call, func, args, kwargs))
+
+
+def offload(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def offload_write(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if write_queue is not None:
+            return await write_queue.submit(func, *args, **kwargs)
+
+        return await run(func, *args, **kwargs)
+
+    return wrapper
+
+
+# Start Guild
+load_guilds = offload(interface.load_guilds)
+create_guild = offload(interface.create_guild)
+update_guild = offload(interface.update_guild)
+# End Guild
+
+
+# Start Raid
+create_raid = offload(interface.create_raid)
+read_raid = offload(interface.read_raid)
+read_raid_roster = offload(interface.read_raid_roster)
+update_raid = offload(interface.update_raid)
+delete_raid = offload(interface.delete_raid)
+get_raid_leader = offload(interface.get_raid_leader)
+set_raid_leader = offload(interface.set_raid_leader)
+get_raid_leaders = offload(interface.get_raid_leaders)
+set_raid_leaders = offload(interface.set_raid_leaders)
+get_raid_backup_leaders = offload(interface.get_raid_backup_leaders)
+set_raid_backup_leaders = offload(interface.set_raid_backup_leaders)
+get_raid_supports = offload(interface.get_raid_supports)
+set_raid_supports = offload(interface.set_raid_supports)
+toggle_raid_participant = offload_write(interface.toggle_raid_participant)
+get_user_raids = offload(interface.get_user_raids)
+archive_raids = offload(interface.archive_raids)
+raids_between = offload(interface.raids_between)
+upcoming_raids = offload(interface.upcoming_raids)
+# End Raid
+
+
+# Start Riddle
+create_riddle = offload(interface.create_riddle)
+read_riddle = offload(interface.read_riddle)
+update_riddle = offload(interface.update_riddle)
+update_riddle_embedding = offload(interface.update_riddle_embedding)
+delete_riddle = offload(interface.delete_riddle)
+# End Riddle
+
+
+# Start Licence
+load_subscribers = offload(interface.load_subscribers)
+create_subscriber = offload(interface.create_subscriber)
+read_subscriber = offload(interface.read_subscriber)
+update_subscriber = offload(interface.update_subscriber)
+delete_subscriber = offload(interface.delete_subscriber)
+# End Licence
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import aiohttp
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attachment (
+    message_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    content_type TEXT,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    PRIMARY KEY (message_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS attachment_guild_hash ON attachment (guild_id, hash);
+CREATE INDEX IF NOT EXISTS attachment_created ON attachment (created_at);
+"""
+
+
+class AttachmentArchive:
+    directory: str
+    concurrency: int
+    guild_quota: int
+    max_file: int
+    chunk: int
+    usage: dict
+    reserved: dict
+    inflight: dict
+
+    def __init__(self, directory: str, concurrency: int = 4, guild_quota: int = 1 << 30, max_file: int = 8 << 20,
+                 chunk: int = 1 << 16):
+        self.directory = directory
+        self.concurrency = concurrency
+        self.guild_quota = guild_quota
+        self.max_file = max_file
+        self.chunk = chunk
+        self.reserved = {}
+        self.inflight = {}
+        self.counters = {"stored": 0, "deduplicated": 0, "skipped": 0, "failed": 0, "bytes": 0}
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session: aiohttp.ClientSession | None = None
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, "tmp"), exist_ok=True)
+
+        self.connection = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False,
+                                          isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode = wal")
+        self.connection.executescript(_SCHEMA)
+        self.usage = self._usage()
+
+    def _usage(self) -> dict:
+        # a file counts once against a guild's quota however often it was posted there
+        rows = self.connection.execute(
+            "SELECT guild_id, sum(size) FROM (SELECT DISTINCT guild_id, hash, size FROM attachment) GROUP BY guild_id"
+        ).fetchall()
+
+        return dict(rows)
+
+    def _blob(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest[2:4], digest)
+
+    def start(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120))
+
+    async def close(self):
+        tasks = [task for tasks in self.inflight.values() for task in tasks]
+
+        if len(tasks) > 0:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+        self.connection.close()
+
+    def preserve(self, message):
+        guild = message.guild.id
+
+        for position, attachment in enumerate(message.attachments):
+            committed = self.usage.get(guild, 0) + self.reserved.get(guild, 0)
+
+            if attachment.size > self.max_file or committed + attachment.size > self.guild_quota:
+                self.counters["skipped"] += 1
+                continue
+
+            # reserve the quota up front so parallel downloads cannot overshoot it; prune rebuilds usage, not this
+            self.reserved[guild] = self.reserved.get(guild, 0) + attachment.size
+
+            task = asyncio.create_task(self._fetch(message.id, position, guild, attachment))
+            self.inflight.setdefault(message.id, []).append(task)
+            task.add_done_callback(lambda _, i=message.id: self._settle(i))
+
+    def _release(self, i_guild: int, i_size: int):
+        self.reserved[i_guild] = max(0, self.reserved.get(i_guild, 0) - i_size)
+
+    def _settle(self, i_message: int):
+        tasks = self.inflight.get(i_message)
+
+        if tasks is not None and all(task.done() for task in tasks):
+            del self.inflight[i_message]
+
+    async def _fetch(self, i_message: int, i_position: int, i_guild: int, attachment):
+        staging = os.path.join(self.directory, "tmp", uuid.uuid4().hex)
+
+        try:
+            async with self.semaphore:
+                digest, size = await self._download(attachment.url, staging)
+
+            await asyncio.to_thread(
+                self._store, staging, i_message, i_position, i_guild, attachment.filename, attachment.content_type,
+                digest, size
+            )
+        except Exception:
+            self.counters["failed"] += 1
+        finally:
+            # a stored file is charged to usage by _store, so the reservation goes either way
+            self._release(i_guild, attachment.size)
+
+            if os.path.exists(staging):
+                os.remove(staging)
+
+    async def _download(self, url: str, staging: str) -> tuple[str, int]:
+        digest = hashlib.sha256()
+        size = 0
+
+        async with self.session.get(url) as response:
+            response.raise_for_status()
+
+            # chunks go straight to disk, so a file is never held in memory whole
+            with open(staging, "wb") as file:
+                async for chunk in response.content.iter_chunked(self.chunk):
+                    size += len(chunk)
+
+                    if size > self.max_file:
+                        raise ValueError(f"{url} is larger than {self.max_file} bytes")
+
+                    digest.update(chunk)
+                    file.write(chunk)
+
+        return digest.hexdigest(), size
+
+    def _store(self, staging: str, i_message: int, i_position: int, i_guild: int, s_filename: str,
+               s_content_type: str | None, s_hash: str, i_size: int):
+        target = self._blob(s_hash)
+
+        # placing the blob and recording it under one lock means prune never sees one without the other
+        with self.lock:
+            if os.path.exists(target):
+                self.counters["deduplicated"] += 1
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(staging, target)
+                self.counters["stored"] += 1
+                self.counters["bytes"] += i_size
+
+            known = self.connection.execute(
+                "SELECT 1 FROM attachment WHERE guild_id = ? AND hash = ? LIMIT 1", (i_guild, s_hash)
+            ).fetchone() is not None
+            self.connection.execute(
+                "INSERT OR REPLACE INTO attachment VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (i_message, i_position, i_guild, s_filename, s_content_type, s_hash, i_size, int(time.time()))
+            )
+
+            # charged under the lock so a concurrent prune either counts the row or sees this increment
+            if not known:
+                self.usage[i_guild] = self.usage.get(i_guild, 0) + i_size
+
+    async def files(self, i_message: int, timeout: float = 10) -> list[tuple[str, str]]:
+        tasks = self.inflight.get(i_message)
+
+        # a quick delete can race the download it would need
+        if tasks is not None:
+            await asyncio.wait(tasks, timeout=timeout)
+
+        return await asyncio.to_thread(self._files, i_message)
+
+    def _files(self, i_message: int) -> list[tuple[str, str]]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT hash, filename FROM attachment WHERE message_id = ? ORDER BY position", (i_message,)
+            ).fetchall()
+
+        return [(self._blob(digest), filename) for digest, filename in rows if os.path.exists(self._blob(digest))]
+
+    def prune(self, i_before: int) -> int:
+        with self.lock:
+            self.connection.execute("DELETE FROM attachment WHERE created_at < ?", (i_before,))
+            referenced = {row[0] for row in self.connection.execute("SELECT DISTINCT hash FROM attachment")}
+            self.usage = self._usage()
+
+        candidates = []
+
+        for root, directories, files in os.walk(self.directory):
+            if root == self.directory:
+                directories[:] = [d for d in directories if d != "tmp"]
+                continue
+
+            candidates.extend(os.path.join(root, name) for name in files if name not in referenced)
+
+        if len(candidates) == 0:
+            return 0
+
+        # downloads may have recorded some of these during the walk, so check again before removing
+        with self.lock:
+            referenced = {row[0] for row in self.connection.execute("SELECT DISTINCT hash FROM attachment")}
+            removed = [path for path in candidates if os.path.basename(path) not in referenced]
+
+            for path in removed:
+                os.remove(path)
+
+        return len(removed)
+
+    def stats(self) -> dict:
+        return self.counters | {"inflight": len(self.inflight)}
@@ -0,0 +1,127 @@
+import argparse
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import time
+
+from datetime import datetime
+
+
+class BackupReport:
+    source: str
+    path: str
+    size: int
+    duration: float
+    finished_at: datetime
+
+    def __init__(self, source: str, path: str, size: int, duration: float):
+        self.source = source
+        self.path = path
+        self.size = size
+        self.duration = duration
+        self.finished_at = datetime.now()
+
+
+last_backups: dict[str, BackupReport] = {}
+
+
+def _snapshot_name(source: str) -> str:
+    return os.path.splitext(os.path.basename(source))[0]
+
+
+def _rotate(directory: str, name: str, keep: int):
+    snapshots = sorted(glob.glob(os.path.join(directory, f"{name}-*.db.gz")))
+
+    for snapshot in snapshots[:-keep] if keep > 0 else []:
+        os.remove(snapshot)
+
+
+def backup(source: str, directory: str, keep: int = 7, pages: int = 256, pause: float = 0.005) -> BackupReport:
+    started = time.perf_counter()
+    name = _snapshot_name(source)
+    os.makedirs(directory, exist_ok=True)
+
+    raw = os.path.join(directory, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.db")
+
+    def progress(status, remaining, total):
+        # give writers a window between page steps; the read lock is released after each step
+        time.sleep(pause)
+
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(raw)
+
+    try:
+        src.backup(dst, pages=pages, progress=progress)
+    finally:
+        dst.close()
+        src.close()
+
+    with open(raw, "rb") as r, gzip.open(raw + ".gz", "wb") as w:
+        shutil.copyfileobj(r, w, 1 << 20)
+
+    os.remove(raw)
+    _rotate(directory, name, keep)
+
+    report = BackupReport(source, raw + ".gz", os.path.getsize(raw + ".gz"), time.perf_counter() - started)
+    last_backups[source] = report
+
+    return report
+
+
+def verify(path: str) -> str:
+    connection = sqlite3.connect(path)
+
+    try:
+        return connection.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def restore(snapshot: str, target: str):
+    staging = target + ".restore"
+
+    with gzip.open(snapshot, "rb") as r, open(staging, "wb") as w:
+        shutil.copyfileobj(r, w, 1 << 20)
+
+    result = verify(staging)
+
+    if result != "ok":
+        os.remove(staging)
+        raise ValueError(f"Snapshot {snapshot} failed the integrity check: {result}")
+
+    # stale WAL files would be replayed over the restored database
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+
+    os.replace(staging, target)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m data.backup", description="Back up or restore Bai databases")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    p_backup = subparsers.add_parser("backup", help="Take a compressed online snapshot")
+    p_backup.add_argument("source")
+    p_backup.add_argument("--directory", default="backups")
+    p_backup.add_argument("--keep", type=int, default=7)
+
+    p_restore = subparsers.add_parser("restore", help="Restore a snapshot (stop the bot first)")
+    p_restore.add_argument("snapshot")
+    p_restore.add_argument("target")
+
+    args = parser.parse_args()
+
+    if args.action == "backup":
+        report = backup(args.source, args.directory, args.keep)
+        print(f"Wrote {report.path} ({report.size} bytes) in {report.duration:.2f}s", file=sys.stderr)
+    else:
+        restore(args.snapshot, args.target)
+        print(f"Restored {args.target} from {args.snapshot}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
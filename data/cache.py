@@ -0,0 +1,86 @@
+import heapq
+import threading
+import time
+
+
+class GuildCache:
+    entries: dict
+    hits: int
+    misses: int
+    ttl: float | None
+
+    def __init__(self, ttl: float = None):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        # only needed when several nodes share the database and may update the same guild
+        self.ttl = ttl
+
+    def get(self, i_guild: int):
+        entry = self.entries.get(i_guild)
+
+        if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[0]
+
+    def put(self, wrap):
+        self.entries[wrap.id] = (wrap, time.monotonic())
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class LicenceIndex:
+    entries: dict
+    expiries: list
+
+    def __init__(self):
+        self.entries = {}
+        self.expiries = []
+        # writes come from the data worker threads, reads from the event loop
+        self.lock = threading.Lock()
+
+    def put(self, i_guild: int, i_since: int, i_until: int):
+        with self.lock:
+            self.entries[i_guild] = (i_since, i_until)
+            heapq.heappush(self.expiries, (i_until, i_guild))
+
+    def remove(self, i_guild: int):
+        # the heap entry is left behind and dropped once it reaches the top
+        with self.lock:
+            self.entries.pop(i_guild, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.expiries.clear()
+
+    def expire(self, i_now: int):
+        with self.lock:
+            while len(self.expiries) > 0 and self.expiries[0][0] <= i_now:
+                until, guild = heapq.heappop(self.expiries)
+                entry = self.entries.get(guild)
+
+                if entry is not None and entry[1] == until:
+                    del self.entries[guild]
+
+    def is_premium(self, i_guild: int, i_now: int = None) -> bool:
+        i_now = i_now or int(time.time())
+        self.expire(i_now)
+
+        entry = self.entries.get(i_guild)
+
+        return entry is not None and entry[0] <= i_now
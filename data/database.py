@@ -0,0 +1,142 @@
+import contextlib
+
+from contextvars import ContextVar
+from os import environ as env
+from urllib.parse import quote_plus
+
+from peewee import DatabaseProxy, SqliteDatabase
+from playhouse.pool import PooledPostgresqlDatabase
+
+
+class QueryCounter:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+
+query_counter: ContextVar[QueryCounter | None] = ContextVar("query_counter", default=None)
+
+
+def count_queries() -> QueryCounter:
+    # the counter is shared with executor threads through the copied context
+    counter = QueryCounter()
+    query_counter.set(counter)
+    return counter
+
+
+class CountingMixin:
+    def execute_sql(self, sql, *args, **kwargs):
+        counter = query_counter.get()
+
+        if counter is not None:
+            counter.count += 1
+
+        return super().execute_sql(sql, *args, **kwargs)
+
+
+class CountingSqliteDatabase(CountingMixin, SqliteDatabase):
+    pass
+
+
+class CountingPostgresqlDatabase(CountingMixin, PooledPostgresqlDatabase):
+    def _is_closed(self, conn) -> bool:
+        if super()._is_closed(conn):
+            return True
+
+        # the pool only notices connections closed on our side; ping to catch ones the server dropped
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except Exception:
+            return True
+
+        return False
+
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "cache_size": -16000,
+    "mmap_size": 134217728,
+    "temp_store": "memory"
+}
+
+db = DatabaseProxy()
+
+
+def _postgresql(conf):
+    return conf.postgresql | {"password": env.get("DATABASE_PASSWORD")}
+
+
+def configure(conf=None):
+    backend = getattr(conf, "backend", "sqlite")
+
+    # connections are opened explicitly: around every offloaded call and once for the calling thread
+    if backend == "postgresql":
+        options = _postgresql(conf)
+        database = CountingPostgresqlDatabase(
+            options["name"],
+            host=options["host"],
+            port=options["port"],
+            user=options["user"],
+            password=options["password"],
+            max_connections=options["max_connections"],
+            stale_timeout=300,
+            autoconnect=False
+        )
+    elif backend == "sqlite":
+        path = getattr(conf, "path", "data.db")
+        pragmas = DEFAULT_PRAGMAS | (getattr(conf, "pragmas", None) or {})
+        database = CountingSqliteDatabase(path, pragmas=pragmas, autoconnect=False)
+    else:
+        raise ValueError(f"Unknown database backend: {backend}")
+
+    db.initialize(database)
+    connect()
+
+
+def jobs_url(conf=None) -> str:
+    backend = getattr(conf, "backend", "sqlite")
+
+    if backend == "postgresql":
+        options = _postgresql(conf)
+        return (f"postgresql://{quote_plus(options['user'])}:{quote_plus(options['password'] or '')}"
+                f"@{options['host']}:{options['port']}/{options['name']}")
+
+    return f"sqlite:///{getattr(conf, 'jobs_path', 'jobs.sqlite')}"
+
+
+def is_sqlite() -> bool:
+    return isinstance(db.obj, SqliteDatabase)
+
+
+def write_transaction():
+    # SQLite: take the write lock up front so read-check-write sequences cannot interleave.
+    # Other backends rely on the raid version compare-and-swap instead.
+    if is_sqlite():
+        return db.atomic("IMMEDIATE")
+
+    return db.atomic()
+
+
+def connect():
+    db.connect(reuse_if_open=True)
+
+
+def close():
+    if db.obj is not None and not db.is_closed():
+        db.close()
+
+
+@contextlib.contextmanager
+def connection():
+    # SQLite keeps one connection per thread; a pooled connection goes back to the pool once the call is done
+    if is_sqlite():
+        connect()
+        yield
+        return
+
+    with db.connection_context():
+        yield
@@ -1,27 +1,58 @@
 import calendar
+import enum
+import functools
 import json
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from peewee import SqliteDatabase, fn, DoesNotExist
-from data.models import Guild, Riddle, Raid, Subscriber
+from peewee import fn, DoesNotExist, IntegrityError, JOIN
+from data.cache import GuildCache, LicenceIndex
+from data.database import write_transaction
+from data.models import db, epoch_now, to_epoch, Guild, Riddle, Raid, RaidArchive, RaidParticipant, \
+    RaidParticipantArchive, ParticipantRole, Subscriber
 
 
 class GuildWrapper():
     id: int
     configuration: dict
-    updated_at: datetime
+    updated_at: int
 
 
-def initialise():
-    db = SqliteDatabase("data.db")
-    db.create_tables([Guild, Raid, Riddle])
+@dataclass(frozen=True, slots=True)
+class RaidRoster:
+    raid: Raid
+    order: tuple[int, ...]
+    leaders: frozenset[int]
+    backup_leaders: frozenset[int]
+    supports: frozenset[int]
+
+    def ordered(self, group: frozenset[int]) -> list[int]:
+        return [user for user in self.order if user in group]
+
+
+class StaleRaid(Exception):
+    pass
+
+
+class RaidConflict(Exception):
+    pass
+
+
+RAID_RETRIES = 5
+
+
+class SignUp(str, enum.Enum):
+    Registered = "registered"
+    Unregistered = "unregistered"
+    Full = "full"
+    Taken = "taken"
 
 
 # Start Guild
-def create_guild(i_guild: int):
-    _ = Guild.get_or_create(id=i_guild)
-    guild = Guild.get(Guild.id == i_guild)
+guild_cache = GuildCache()
+
 
+def _wrap_guild(guild: Guild):
     wrap = GuildWrapper()
     wrap.id = guild.id
     wrap.configuration = json.loads(guild.configuration or "{}")
@@ -30,6 +61,28 @@ def create_guild(i_guild: int):
     return wrap
 
 
+def load_guilds():
+    guild_cache.clear()
+
+    for guild in Guild.select():
+        guild_cache.put(_wrap_guild(guild))
+
+
+def create_guild(i_guild: int):
+    wrap = guild_cache.get(i_guild)
+
+    if wrap is not None:
+        return wrap
+
+    _ = Guild.get_or_create(id=i_guild)
+    guild = Guild.get(Guild.id == i_guild)
+
+    wrap = _wrap_guild(guild)
+    guild_cache.put(wrap)
+
+    return wrap
+
+
 def update_guild(i_guild: int, o_configuration: dict = None):
     _ = Guild.get_or_create(id=i_guild)
     guild = Guild.get(Guild.id == i_guild)
@@ -42,10 +95,8 @@ def update_guild(i_guild: int, o_configuration: dict = None):
 
     guild.save()
 
-    wrap = GuildWrapper()
-    wrap.id = guild.id
-    wrap.configuration = json.loads(guild.configuration)
-    wrap.updated_at = guild.updated_at
+    wrap = _wrap_guild(guild)
+    guild_cache.put(wrap)
 
     return wrap
 # End Guild
@@ -58,122 +109,326 @@ def create_raid(i_guild: int, i_user: int, s_title: str, s_description: str, d_a
     return raid
 
 
+def _read_raid_version(i_raid: int) -> int:
+    version = Raid.select(Raid.version).where(Raid.id == i_raid).scalar()
+
+    if version is None:
+        raise Raid.DoesNotExist(f"Raid {i_raid} does not exist")
+
+    return version
+
+
+def _bump_raid_version(i_raid: int, i_version: int, **changes):
+    # compare-and-swap: only succeeds if nobody else wrote the raid since i_version was read
+    updated = (Raid
+               .update(version=Raid.version + 1, updated_at=epoch_now(), **changes)
+               .where(Raid.id == i_raid, Raid.version == i_version)
+               .execute())
+
+    if updated == 0:
+        raise StaleRaid(f"Raid {i_raid} changed since version {i_version}")
+
+
+def _add_raid_participant(i_raid: int, i_user: int, e_role: ParticipantRole):
+    # without SQLite's up-front write lock, a concurrent sign-up by the same user can insert first
+    try:
+        RaidParticipant.insert(raid=i_raid, user=i_user, role=e_role.value).execute()
+    except IntegrityError:
+        raise StaleRaid(f"User {i_user} signed up to raid {i_raid} concurrently")
+
+
+def _retry_stale_raid(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for _ in range(RAID_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except StaleRaid:
+                continue
+
+        raise RaidConflict(f"Gave up after {RAID_RETRIES} concurrent updates")
+
+    return wrapper
+
+
+@_retry_stale_raid
+def _update_raid(i_raid: int, changes: dict, o_participants: dict = None):
+    with write_transaction():
+        version = _read_raid_version(i_raid)
+        _bump_raid_version(i_raid, version, **changes)
+
+        if o_participants is not None:
+            _replace_raid_participants(i_raid, o_participants)
+
+
 def read_raid(i_raid: int):
-    raid = Raid.get(Raid.id == i_raid)
+    raid = Raid.get_or_none(Raid.id == i_raid)
+
+    if raid is None:
+        raid = RaidArchive.get(RaidArchive.id == i_raid)
+
     return raid
 
 
+def _select_raid_roster(m_raid, m_participant, i_raid: int):
+    return list(m_raid
+                .select(m_raid, m_participant.user, m_participant.role)
+                .join(m_participant, JOIN.LEFT_OUTER, on=(m_participant.raid == m_raid.id))
+                .where(m_raid.id == i_raid)
+                .order_by(m_participant.joined_at, m_participant.id)
+                .objects())
+
+
+def read_raid_roster(i_raid: int):
+    rows = _select_raid_roster(Raid, RaidParticipant, i_raid)
+
+    if len(rows) == 0:
+        rows = _select_raid_roster(RaidArchive, RaidParticipantArchive, i_raid)
+
+    if len(rows) == 0:
+        raise Raid.DoesNotExist(f"Raid {i_raid} does not exist")
+
+    groups = {role: set() for role in ParticipantRole}
+    order = []
+
+    for row in rows:
+        if row.user is None:
+            continue
+
+        groups[ParticipantRole(row.role)].add(row.user)
+        order.append(row.user)
+
+    return RaidRoster(
+        raid=rows[0],
+        order=tuple(order),
+        leaders=frozenset(groups[ParticipantRole.Leader]),
+        backup_leaders=frozenset(groups[ParticipantRole.BackupLeader]),
+        supports=frozenset(groups[ParticipantRole.Support])
+    )
+
+
 def update_raid(i_raid: int, s_title: str = None, s_description: str = None, o_participants: dict = None, d_apply_by: datetime = None, d_happens_on: datetime = None):
-    raid = read_raid(i_raid)
+    changes = {}
 
     if s_title is not None:
-        raid.title = s_title
+        changes["title"] = s_title
     if s_description is not None:
-        raid.description = s_description
-    if o_participants is not None:
-        raid.participants = json.dumps(o_participants)
+        changes["description"] = s_description
     if d_apply_by is not None:
-        raid.apply_by = d_apply_by
+        changes["apply_by"] = d_apply_by
     if d_happens_on is not None:
-        raid.happens_on = d_happens_on
+        changes["happens_on"] = d_happens_on
 
-    raid.save()
+    _update_raid(i_raid, changes, o_participants)
 
 
 def delete_raid(i_raid: int):
     raid = read_raid(i_raid)
-    raid.delete_instance()
 
+    with db.atomic():
+        # read_raid may have found the raid in the archive, whose participants live in their own table
+        participant = RaidParticipantArchive if isinstance(raid, RaidArchive) else RaidParticipant
+        participant.delete().where(participant.raid == raid.id).execute()
+        raid.delete_instance()
 
-def get_raid_leader(i_raid: int):
-    raid = read_raid(i_raid)
-    participants: dict = json.loads(raid.participants or "{}")
 
-    try:
-        return participants["leader"]
-    except KeyError:
-        return None
+def _replace_raid_participants(i_raid: int, o_participants: dict):
+    RaidParticipant.delete().where(RaidParticipant.raid == i_raid).execute()
 
+    rows = []
+    seen = set()
 
-def set_raid_leader(i_raid: int, leader: int):
-    raid = read_raid(i_raid)
-    participants: dict = json.loads(raid.participants or "{}")
-    participants["leader"] = leader
+    for key, role in (("leader", ParticipantRole.Leader), ("leaders", ParticipantRole.Leader),
+                      ("backup_leaders", ParticipantRole.BackupLeader), ("supports", ParticipantRole.Support)):
+        users = o_participants.get(key) or []
 
-    raid.participants = json.dumps(participants)
-    raid.save()
+        if not isinstance(users, list):
+            users = [users]
 
+        for user in users:
+            if user in seen:
+                continue
 
-def get_raid_leaders(i_raid: int):
-    raid = read_raid(i_raid)
-    participants: dict = json.loads(raid.participants or "{}")
+            seen.add(user)
+            rows.append({"raid": i_raid, "user": user, "role": role.value})
 
-    try:
-        return participants["leaders"]
-    except KeyError:
-        return []
+    if len(rows) > 0:
+        RaidParticipant.insert_many(rows).execute()
 
 
-def set_raid_leaders(i_raid: int, leaders: list[int]):
-    raid = read_raid(i_raid)
-    participants: dict = json.loads(raid.participants or "{}")
+def migrate_raid_participants():
+    # runs as migration 1, so only touch columns that existed back then
+    for raid in Raid.select(Raid.id, Raid.participants).where(Raid.participants.not_in(["{}", ""])):
+        with db.atomic():
+            _replace_raid_participants(raid.id, json.loads(raid.participants))
+            Raid.update(participants="{}", updated_at=epoch_now()).where(Raid.id == raid.id).execute()
 
-    try:
-        participants["leaders"] = list(set(participants["leaders"]) ^ set(leaders))
-    except KeyError:
-        participants["leaders"] = leaders
 
-    raid.participants = json.dumps(participants)
-    raid.save()
+def _get_raid_participants(i_raid: int, e_role: ParticipantRole):
+    query = (RaidParticipant
+             .select(RaidParticipant.user)
+             .where(RaidParticipant.raid == i_raid, RaidParticipant.role == e_role.value)
+             .order_by(RaidParticipant.joined_at, RaidParticipant.id))
 
+    return [participant.user for participant in query]
 
-def get_raid_backup_leaders(i_raid: int):
-    raid = read_raid(i_raid)
-    participants: dict = json.loads(raid.participants or "{}")
 
-    try:
-        return participants["backup_leaders"]
-    except KeyError:
-        return []
+def _set_raid_participants(i_raid: int, e_role: ParticipantRole, users: list[int]):
+    for user in users:
+        toggle_raid_participant(i_raid, user, e_role)
 
 
-def set_raid_backup_leaders(i_raid: int, leaders: list[int]):
-    raid = read_raid(i_raid)
-    participants: dict = json.loads(raid.participants or "{}")
+@_retry_stale_raid
+def toggle_raid_participant(i_raid: int, i_user: int, e_role: ParticipantRole, i_capacity: int = None, t_promote: tuple = ()):
+    with write_transaction():
+        version = _read_raid_version(i_raid)
+        participant = RaidParticipant.get_or_none(RaidParticipant.raid == i_raid, RaidParticipant.user == i_user)
 
-    try:
-        participants["backup_leaders"] = list(set(participants["backup_leaders"]) ^ set(leaders))
-    except KeyError:
-        participants["backup_leaders"] = leaders
+        if participant is not None and participant.role == e_role:
+            participant.delete_instance()
+            _bump_raid_version(i_raid, version)
+            return SignUp.Unregistered
 
+        if participant is not None and participant.role not in t_promote:
+            return SignUp.Taken
 
-def get_raid_supports(i_raid: int):
-    raid = read_raid(i_raid)
-    participants: dict = json.loads(raid.participants or "{}")
+        if i_capacity is not None:
+            taken = (RaidParticipant
+                     .select()
+                     .where(RaidParticipant.raid == i_raid, RaidParticipant.role == e_role.value)
+                     .count())
 
-    try:
-        return participants["supports"]
-    except KeyError:
-        return []
+            if taken >= i_capacity:
+                return SignUp.Full
 
+        if participant is None:
+            _add_raid_participant(i_raid, i_user, e_role)
+        else:
+            participant.role = e_role.value
+            participant.joined_at = epoch_now()
+            participant.save()
 
-def set_raid_supports(i_raid: int, supports: list[int]):
-    raid = read_raid(i_raid)
-    participants: dict = json.loads(raid.participants or "{}")
+        _bump_raid_version(i_raid, version)
+        return SignUp.Registered
+
+
+def get_user_raids(i_user: int, i_guild: int = None):
+    query = (Raid
+             .select(Raid, RaidParticipant.role)
+             .join(RaidParticipant)
+             .where(RaidParticipant.user == i_user))
+
+    if i_guild is not None:
+        query = query.where(Raid.guild == i_guild)
+
+    return list(query.order_by(Raid.happens_on).objects())
+
+
+def archive_raids(d_before: datetime, i_batch: int = 500):
+    archived = 0
+    raid_fields = [field.name for field in Raid._meta.sorted_fields]
+    participant_fields = ["raid", "user", "role", "joined_at"]
+
+    while True:
+        with db.atomic():
+            # the newest raid always stays hot, so SQLite never hands out an archived id again
+            newest = Raid.select(fn.MAX(Raid.id))
+            ids = [raid.id for raid in Raid
+                   .select(Raid.id)
+                   .where(Raid.happens_on < d_before, Raid.id < newest)
+                   .limit(i_batch)]
+
+            if len(ids) == 0:
+                break
+
+            (RaidArchive
+             .insert_from(Raid.select(*[getattr(Raid, name) for name in raid_fields]).where(Raid.id.in_(ids)),
+                          [getattr(RaidArchive, name) for name in raid_fields])
+             .execute())
+            (RaidParticipantArchive
+             .insert_from(RaidParticipant
+                          .select(*[getattr(RaidParticipant, name) for name in participant_fields])
+                          .where(RaidParticipant.raid.in_(ids)),
+                          [getattr(RaidParticipantArchive, name) for name in participant_fields])
+             .execute())
+            RaidParticipant.delete().where(RaidParticipant.raid.in_(ids)).execute()
+            Raid.delete().where(Raid.id.in_(ids)).execute()
+
+        archived += len(ids)
+
+    return archived
+
+
+def raids_between(i_guild: int, d_start: datetime | int, d_end: datetime | int):
+    query = (Raid
+             .select()
+             .where(Raid.guild == i_guild, Raid.happens_on >= d_start, Raid.happens_on < d_end)
+             .order_by(Raid.happens_on))
+
+    return list(query)
+
+
+def upcoming_raids(i_guild: int, i_limit: int = 10):
+    query = (Raid
+             .select()
+             .where(Raid.guild == i_guild, Raid.happens_on >= epoch_now())
+             .order_by(Raid.happens_on)
+             .limit(i_limit))
+
+    return list(query)
+
+
+def get_raid_leader(i_raid: int):
+    leaders = get_raid_leaders(i_raid)
 
     try:
-        participants["supports"] = list(set(participants["supports"]) ^ set(supports))
-    except KeyError:
-        participants["supports"] = supports
+        return leaders[0]
+    except IndexError:
+        return None
+
+
+@_retry_stale_raid
+def set_raid_leader(i_raid: int, leader: int):
+    with write_transaction():
+        version = _read_raid_version(i_raid)
+        (RaidParticipant
+         .delete()
+         .where(RaidParticipant.raid == i_raid, RaidParticipant.role == ParticipantRole.Leader.value)
+         .execute())
+        RaidParticipant.delete().where(RaidParticipant.raid == i_raid, RaidParticipant.user == leader).execute()
+        _add_raid_participant(i_raid, leader, ParticipantRole.Leader)
+        _bump_raid_version(i_raid, version)
+
+
+def get_raid_leaders(i_raid: int):
+    return _get_raid_participants(i_raid, ParticipantRole.Leader)
+
+
+def set_raid_leaders(i_raid: int, leaders: list[int]):
+    _set_raid_participants(i_raid, ParticipantRole.Leader, leaders)
+
+
+def get_raid_backup_leaders(i_raid: int):
+    return _get_raid_participants(i_raid, ParticipantRole.BackupLeader)
+
+
+def set_raid_backup_leaders(i_raid: int, leaders: list[int]):
+    _set_raid_participants(i_raid, ParticipantRole.BackupLeader, leaders)
+
+
+def get_raid_supports(i_raid: int):
+    return _get_raid_participants(i_raid, ParticipantRole.Support)
+
 
-    raid.participants = json.dumps(participants)
-    raid.save()
+def set_raid_supports(i_raid: int, supports: list[int]):
+    _set_raid_participants(i_raid, ParticipantRole.Support, supports)
 # End Raid
 
 
 # Start Riddle
-def create_riddle(i_guild: int, i_user: int, s_text: str, s_solution: str):
-    _ = Riddle.get_or_create(guild=i_guild, user=i_user, text=s_text, solution=s_solution)
+def create_riddle(i_guild: int, i_user: int, s_text: str, s_solution: str, b_embedding: bytes = None):
+    _ = Riddle.get_or_create(guild=i_guild, user=i_user, text=s_text, solution=s_solution,
+                             defaults={'solution_embedding': b_embedding})
     riddle = Riddle.get(Riddle.guild == i_guild, Riddle.user == i_user)
     return riddle
 
@@ -183,7 +438,8 @@ def read_riddle(i_guild: int, i_user: int):
     return riddle
 
 
-def update_riddle(i_guild: int, i_user: int, s_text: str = None, s_solution: str = None, b_sudoku: bool = False):
+def update_riddle(i_guild: int, i_user: int, s_text: str = None, s_solution: str = None, b_sudoku: bool = False,
+                  b_embedding: bytes = None):
     riddle = read_riddle(i_guild, i_user)
 
     if s_text is not None:
@@ -191,6 +447,8 @@ def update_riddle(i_guild: int, i_user: int, s_text: str = None, s_solution: str
 
     if s_solution is not None:
         riddle.solution = s_solution
+        # the old embedding belongs to the old solution
+        riddle.solution_embedding = b_embedding
 
     riddle.is_sudoku = b_sudoku
 
@@ -198,6 +456,10 @@ def update_riddle(i_guild: int, i_user: int, s_text: str = None, s_solution: str
     return riddle
 
 
+def update_riddle_embedding(i_guild: int, i_user: int, b_embedding: bytes):
+    Riddle.update(solution_embedding=b_embedding).where(Riddle.guild == i_guild, Riddle.user == i_user).execute()
+
+
 def delete_riddle(i_guild: int, i_user: int):
     riddle = read_riddle(i_guild, i_user)
     riddle.delete_instance()
@@ -205,9 +467,20 @@ def delete_riddle(i_guild: int, i_user: int):
 
 
 # Start Licence
+licence_index = LicenceIndex()
+
+
+def load_subscribers():
+    licence_index.clear()
+
+    for subscriber in Subscriber.select().where(Subscriber.until > epoch_now()):
+        licence_index.put(subscriber.guild_id, subscriber.since, subscriber.until)
+
+
 def create_subscriber(i_guild: int, t_name: str, d_since: datetime, d_until: datetime):
     _ = Subscriber.get_or_create(guild=i_guild, name=t_name, since=d_since, until=d_until)
     subscriber = Subscriber.get(Subscriber.guild == i_guild)
+    licence_index.put(i_guild, to_epoch(d_since), to_epoch(d_until))
     return subscriber
 
 
@@ -226,10 +499,12 @@ def update_subscriber(i_guild: int, t_name: str = None, d_since: datetime = None
         subscriber.until = d_until
 
     subscriber.save()
+    licence_index.put(i_guild, to_epoch(subscriber.since), to_epoch(subscriber.until))
     return subscriber
 
 
 def delete_subscriber(i_guild: int):
     subscriber = read_subscriber(i_guild)
     subscriber.delete_instance()
+    licence_index.remove(i_guild)
 # End Licence
\ No newline at end of file
@@ -0,0 +1,200 @@
+import asyncio
+import contextlib
+import enum
+import sqlite3
+import threading
+
+from dataclasses import dataclass
+
+
+class LogKind(str, enum.Enum):
+    Edit = "edit"
+    Delete = "delete"
+    Leave = "leave"
+
+
+@dataclass(frozen=True, slots=True)
+class LogEntry:
+    kind: LogKind
+    guild_id: int
+    channel_id: int | None
+    user_id: int
+    user_name: str
+    message_id: int | None
+    before: str | None
+    content: str
+    created_at: int
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entry (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER,
+    user_id INTEGER NOT NULL,
+    user_name TEXT NOT NULL,
+    message_id INTEGER,
+    before TEXT,
+    content TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entry_guild_created ON entry (guild_id, created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS entry_fts USING fts5(
+    content, before, user_name, content='entry', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS entry_ai AFTER INSERT ON entry BEGIN
+    INSERT INTO entry_fts (rowid, content, before, user_name) VALUES (new.id, new.content, new.before, new.user_name);
+END;
+CREATE TRIGGER IF NOT EXISTS entry_ad AFTER DELETE ON entry BEGIN
+    INSERT INTO entry_fts (entry_fts, rowid, content, before, user_name)
+    VALUES ('delete', old.id, old.content, old.before, old.user_name);
+END;
+"""
+
+_COLUMNS = "kind, guild_id, channel_id, user_id, user_name, message_id, before, content, created_at"
+
+
+def _match(s_text: str) -> str:
+    # every word becomes a quoted prefix term, so user input can never be parsed as FTS syntax
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in s_text.split())
+
+
+def _from_row(row: tuple) -> LogEntry:
+    return LogEntry(LogKind(row[0]), *row[1:])
+
+
+class LogArchive:
+    path: str
+    interval: float
+    pending: list
+    written: int
+    dropped: int
+
+    def __init__(self, path: str, interval: float = 2.0, logger=None):
+        self.path = path
+        self.interval = interval
+        self.logger = logger
+        self.pending = []
+        self.written = 0
+        self.dropped = 0
+        self.task: asyncio.Task | None = None
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode = wal")
+        self.connection.execute("PRAGMA synchronous = normal")
+        self.connection.executescript(_SCHEMA)
+
+        # WAL lets searches read from their own connection while a batch is being written
+        self.reader = sqlite3.connect(path, check_same_thread=False)
+        self.read_lock = threading.Lock()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+
+            self.task = None
+
+        await self._write()
+        await asyncio.to_thread(self._close)
+
+    def _close(self):
+        # a flush or search still running in its thread finishes before its connection goes
+        with self.read_lock:
+            self.reader.close()
+
+        with self.lock:
+            self.connection.close()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            if len(self.pending) > 0:
+                await self._write()
+
+    async def _write(self):
+        batch = self._take()
+
+        try:
+            await asyncio.to_thread(self._flush, batch)
+        except Exception as e:
+            self.dropped += len(batch)
+
+            if self.logger is not None:
+                self.logger.error(f"Could not archive {len(batch)} log entries: {e}")
+
+    def _take(self) -> list:
+        batch = self.pending
+        self.pending = []
+
+        return batch
+
+    def put(self, entry: LogEntry):
+        self.pending.append(entry)
+
+    def _flush(self, batch: list):
+        if len(batch) == 0:
+            return
+
+        with self.lock:
+            try:
+                self.connection.execute("BEGIN")
+                self.connection.executemany(
+                    f"INSERT INTO entry ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(e.kind.value, e.guild_id, e.channel_id, e.user_id, e.user_name, e.message_id, e.before,
+                      e.content, e.created_at) for e in batch]
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                # a connection left inside the transaction would fail every later flush
+                if self.connection.in_transaction:
+                    self.connection.execute("ROLLBACK")
+                raise
+
+            self.written += len(batch)
+
+    def prune(self, i_before: int) -> int:
+        with self.lock:
+            return self.connection.execute("DELETE FROM entry WHERE created_at < ?", (i_before,)).rowcount
+
+    def search(self, i_guild: int, s_text: str = None, i_user: int = None, i_channel: int = None,
+               i_since: int = None, i_until: int = None, i_limit: int = 10) -> list[LogEntry]:
+        conditions = ["e.guild_id = ?"]
+        params: list = [i_guild]
+
+        for condition, value in (("e.user_id = ?", i_user), ("e.channel_id = ?", i_channel),
+                                 ("e.created_at >= ?", i_since), ("e.created_at < ?", i_until)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+
+        if s_text is not None and _match(s_text) != "":
+            sql = (f"SELECT {', '.join('e.' + c for c in _COLUMNS.split(', '))} "
+                   f"FROM entry_fts JOIN entry e ON e.id = entry_fts.rowid "
+                   f"WHERE entry_fts MATCH ? AND {' AND '.join(conditions)} "
+                   f"ORDER BY bm25(entry_fts) LIMIT ?")
+            params = [_match(s_text)] + params
+        else:
+            sql = (f"SELECT {', '.join('e.' + c for c in _COLUMNS.split(', '))} FROM entry e "
+                   f"WHERE {' AND '.join(conditions)} ORDER BY e.created_at DESC LIMIT ?")
+
+        with self.read_lock:
+            rows = self.reader.execute(sql, params + [i_limit]).fetchall()
+
+        return [_from_row(row) for row in rows]
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "pending": len(self.pending)
+        }
@@ -0,0 +1,80 @@
+import os
+import sqlite3
+
+from datetime import datetime, timedelta
+
+from data.database import db, is_sqlite
+from data.models import Riddle, Subscriber
+
+
+def prune_riddles(o_inmates: dict[int, set[int]], i_before: int) -> int:
+    pruned = 0
+
+    # inmates who left the guild, or whose release failed half-way, no longer hold the inmate role;
+    # riddles written after the snapshot of o_inmates was taken are left for the next sweep
+    for guild, inmates in o_inmates.items():
+        orphans = [riddle.user for riddle in Riddle
+                   .select(Riddle.user)
+                   .where(Riddle.guild == guild, Riddle.updated_at < i_before)
+                   if riddle.user not in inmates]
+
+        if len(orphans) > 0:
+            pruned += Riddle.delete().where(Riddle.guild == guild, Riddle.user.in_(orphans)).execute()
+
+    return pruned
+
+
+def prune_subscribers(i_days: int) -> int:
+    return Subscriber.delete().where(Subscriber.until < datetime.now() - timedelta(days=i_days)).execute()
+
+
+def enable_incremental_vacuum(path: str) -> bool:
+    connection = sqlite3.connect(path, isolation_level=None)
+
+    try:
+        if connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+
+        # switching an existing file needs one full rewrite, which only startup can afford
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute("VACUUM")
+        return True
+    finally:
+        connection.close()
+
+
+def incremental_vacuum(connection, i_pages: int) -> int:
+    # files that were never switched keep their free pages until the next startup converts them
+    if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    free_before = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    connection.execute(f"PRAGMA incremental_vacuum({int(i_pages)})").fetchall()
+
+    free_after = connection.execute("PRAGMA freelist_count").fetchone()[0]
+
+    return max(free_before - free_after, 0) * page_size
+
+
+def sweep(o_retention: dict, o_inmates: dict[int, set[int]], i_since: int, i_pages: int, jobs_path: str = None) -> dict:
+    report = {
+        "riddles": prune_riddles(o_inmates, i_since),
+        "subscribers": prune_subscribers(o_retention["subscriber_days"]),
+        "reclaimed": 0
+    }
+
+    if not is_sqlite():
+        return report
+
+    report["reclaimed"] += incremental_vacuum(db.connection(), i_pages)
+
+    if jobs_path is not None and os.path.exists(jobs_path):
+        connection = sqlite3.connect(jobs_path, isolation_level=None)
+
+        try:
+            report["reclaimed"] += incremental_vacuum(connection, i_pages)
+        finally:
+            connection.close()
+
+    return report
@@ -0,0 +1,249 @@
+import asyncio
+import contextlib
+import json
+import sqlite3
+import threading
+
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+
+
+@dataclass(frozen=True, slots=True)
+class StoredAttachment:
+    filename: str
+    url: str
+    content_type: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class StoredMessage:
+    id: int
+    guild_id: int
+    channel_id: int
+    author_id: int
+    author_name: str
+    author_bot: bool
+    content: str
+    attachments: tuple[StoredAttachment, ...]
+    created_at: int
+
+    @property
+    def author_mention(self) -> str:
+        return f"<@{self.author_id}>"
+
+    @property
+    def channel_mention(self) -> str:
+        return f"<#{self.channel_id}>"
+
+    @property
+    def jump_url(self) -> str:
+        return f"https://discord.com/channels/{self.guild_id}/{self.channel_id}/{self.id}"
+
+    @property
+    def created(self) -> datetime:
+        return datetime.fromtimestamp(self.created_at, timezone.utc)
+
+    @classmethod
+    def from_message(cls, message):
+        return cls(
+            id=message.id,
+            guild_id=message.guild.id,
+            channel_id=message.channel.id,
+            author_id=message.author.id,
+            author_name=message.author.name,
+            author_bot=message.author.bot,
+            content=message.content,
+            attachments=tuple(StoredAttachment(a.filename, a.url, a.content_type) for a in message.attachments),
+            created_at=int(message.created_at.timestamp())
+        )
+
+    def edited(self, data: dict):
+        # raw edit payloads only carry the fields that changed
+        if "attachments" in data:
+            attachments = tuple(StoredAttachment(a["filename"], a["url"], a.get("content_type"))
+                                for a in data["attachments"])
+        else:
+            attachments = self.attachments
+
+        return replace(self, content=data.get("content", self.content), attachments=attachments)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS message (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    author_name TEXT NOT NULL,
+    author_bot INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    attachments TEXT,
+    created_at INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+_COLUMNS = "id, guild_id, channel_id, author_id, author_name, author_bot, content, attachments, created_at"
+
+
+def _to_row(message: StoredMessage) -> tuple:
+    attachments = json.dumps([[a.filename, a.url, a.content_type] for a in message.attachments]) \
+        if len(message.attachments) > 0 else None
+
+    return (message.id, message.guild_id, message.channel_id, message.author_id, message.author_name,
+            int(message.author_bot), message.content, attachments, message.created_at)
+
+
+def _from_row(row: tuple) -> StoredMessage:
+    attachments = tuple(StoredAttachment(*a) for a in json.loads(row[7])) if row[7] is not None else ()
+
+    return StoredMessage(row[0], row[1], row[2], row[3], row[4], bool(row[5]), row[6], attachments, row[8])
+
+
+class MessageStore:
+    path: str
+    max_rows: int
+    interval: float
+    pending: dict
+    count: int
+    evicted: int
+    dropped: int
+
+    def __init__(self, path: str, max_rows: int = 500000, interval: float = 1.0, logger=None):
+        self.path = path
+        self.max_rows = max_rows
+        self.interval = interval
+        self.logger = logger
+        self.pending = {}
+        self.evicted = 0
+        self.dropped = 0
+        self.task: asyncio.Task | None = None
+        self.deletes = set()
+        self.lock = threading.Lock()
+
+        # a lost tail after a crash only means a few unlogged deletes, so durability is traded for speed
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode = wal")
+        self.connection.execute("PRAGMA synchronous = off")
+        self.connection.execute(_SCHEMA)
+        self.count = self.connection.execute("SELECT count(*) FROM message").fetchone()[0]
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+
+            self.task = None
+
+        if len(self.deletes) > 0:
+            await asyncio.gather(*self.deletes, return_exceptions=True)
+
+        await self._write()
+        await asyncio.to_thread(self._close)
+
+    def _close(self):
+        # a flush cancelled mid-way keeps running in its thread; the lock waits for it
+        with self.lock:
+            self.connection.close()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            if len(self.pending) > 0:
+                await self._write()
+
+    async def _write(self):
+        batch = self._take()
+
+        try:
+            await asyncio.to_thread(self._flush, batch)
+        except Exception as e:
+            # losing one batch only means a few unlogged deletes; the loop has to survive it
+            self.dropped += len(batch)
+
+            if self.logger is not None:
+                self.logger.error(f"Could not store {len(batch)} message(s): {e}")
+
+    def _take(self) -> list:
+        batch = list(self.pending.values())
+        self.pending = {}
+
+        return batch
+
+    def put(self, message: StoredMessage):
+        # writes are buffered on the loop and flushed in one transaction per interval
+        self.pending[message.id] = message
+
+    async def get(self, i_message: int) -> StoredMessage | None:
+        message = self.pending.get(i_message)
+
+        if message is not None:
+            return message
+
+        return await asyncio.to_thread(self._select, i_message)
+
+    def discard(self, i_messages: list[int]):
+        for i_message in i_messages:
+            self.pending.pop(i_message, None)
+
+        # the loop only keeps weak references to tasks, so hold on to it until it is done
+        task = asyncio.create_task(asyncio.to_thread(self._delete, i_messages))
+        self.deletes.add(task)
+        task.add_done_callback(self.deletes.discard)
+
+    def _select(self, i_message: int) -> StoredMessage | None:
+        with self.lock:
+            row = self.connection.execute(f"SELECT {_COLUMNS} FROM message WHERE id = ?", (i_message,)).fetchone()
+
+        return None if row is None else _from_row(row)
+
+    def _delete(self, i_messages: list[int]):
+        with self.lock:
+            cursor = self.connection.executemany("DELETE FROM message WHERE id = ?", [(i,) for i in i_messages])
+            self.count -= cursor.rowcount
+
+    def _flush(self, batch: list):
+        if len(batch) == 0:
+            return
+
+        with self.lock:
+            try:
+                self.connection.execute("BEGIN")
+                self.connection.executemany(
+                    f"INSERT OR REPLACE INTO message ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [_to_row(message) for message in batch]
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                # a connection left inside the transaction would fail every later flush
+                if self.connection.in_transaction:
+                    self.connection.execute("ROLLBACK")
+                raise
+
+            self.count += len(batch)
+
+            # snowflakes grow with time, so the lowest ids are the oldest messages; evict a tenth at a time
+            if self.count > self.max_rows:
+                keep = self.max_rows - self.max_rows // 10
+                cursor = self.connection.execute(
+                    "DELETE FROM message WHERE id <= (SELECT id FROM message ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (keep,)
+                )
+                self.evicted += cursor.rowcount
+                # replaced rows were counted as inserts, so never trust more than what was kept
+                self.count = min(self.count - cursor.rowcount, keep)
+
+    def stats(self) -> dict:
+        return {
+            "rows": self.count,
+            "pending": len(self.pending),
+            "evicted": self.evicted,
+            "dropped": self.dropped,
+            "max_rows": self.max_rows
+        }
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from peewee import BlobField, IntegerField
+from playhouse.migrate import SchemaMigrator, migrate
+
+from data.database import is_sqlite
+from data.interface import migrate_raid_participants
+from data.models import db, EpochField, Guild, Raid, RaidArchive, RaidParticipant, RaidParticipantArchive, Riddle, Subscriber, \
+    SchemaVersion
+
+
+def _create_tables():
+    db.create_tables([Guild, Raid, RaidParticipant, Riddle, Subscriber])
+    migrate_raid_participants()
+
+
+def _create_indexes():
+    for model in (Raid, Subscriber):
+        model._schema.create_indexes(safe=True)
+
+
+def _create_archive():
+    db.create_tables([RaidArchive, RaidParticipantArchive])
+
+
+def _add_raid_versions():
+    migrator = SchemaMigrator.from_database(db.obj)
+
+    for model in (Raid, RaidArchive):
+        columns = [column.name for column in db.get_columns(model._meta.table_name)]
+
+        if "version" not in columns:
+            migrate(migrator.add_column(model._meta.table_name, "version", IntegerField(default=0)))
+
+
+def _convert_timestamps():
+    # DateTimeField stored naive local times as text; EpochField stores integer seconds
+    if not is_sqlite():
+        return
+
+    for model in (Guild, Raid, RaidArchive, RaidParticipant, RaidParticipantArchive, Riddle, Subscriber):
+        table = model._meta.table_name
+
+        for field in model._meta.sorted_fields:
+            if not isinstance(field, EpochField):
+                continue
+
+            cursor = db.execute_sql(f'SELECT rowid, "{field.column_name}" FROM "{table}" WHERE typeof("{field.column_name}") = \'text\'')
+
+            for rowid, value in cursor.fetchall():
+                epoch = int(datetime.fromisoformat(value).timestamp())
+                db.execute_sql(f'UPDATE "{table}" SET "{field.column_name}" = ? WHERE rowid = ?', (epoch, rowid))
+
+    Subscriber._schema.create_indexes(safe=True)
+
+
+def _add_riddle_embeddings():
+    migrator = SchemaMigrator.from_database(db.obj)
+    columns = [column.name for column in db.get_columns(Riddle._meta.table_name)]
+
+    if "solution_embedding" not in columns:
+        migrate(migrator.add_column(Riddle._meta.table_name, "solution_embedding", BlobField(null=True)))
+
+
+# Append only: the position of a migration in this list is the schema version it produces
+MIGRATIONS = [
+    _create_tables,
+    _create_indexes,
+    _create_archive,
+    _add_raid_versions,
+    _convert_timestamps,
+    _add_riddle_embeddings,
+]
+
+
+def get_version() -> int:
+    db.create_tables([SchemaVersion])
+    schema = SchemaVersion.get_or_none()
+
+    return 0 if schema is None else schema.version
+
+
+def run():
+    current = get_version()
+
+    for version, migration in enumerate(MIGRATIONS[current:], start=current + 1):
+        with db.atomic():
+            migration()
+            SchemaVersion.delete().execute()
+            SchemaVersion.create(version=version)
+
+    return get_version()
@@ -1,12 +1,37 @@
-import calendar
 import datetime
+import enum
+import time
 
 from peewee import *
 
-db = SqliteDatabase("data.db")
+from data.database import db
+
+
+def epoch_now() -> int:
+    return int(time.time())
+
+
+def to_epoch(value):
+    if isinstance(value, datetime.datetime):
+        return int(value.timestamp())
+
+    return value
+
+
+class EpochField(BigIntegerField):
+    # integer seconds since the epoch (UTC); datetimes are converted on the way in
+    def db_value(self, value):
+        return super().db_value(to_epoch(value))
 
 
 class BaseModel(Model):
+    def save(self, *args, **kwargs):
+        if 'updated_at' in self._meta.fields:
+            self.updated_at = epoch_now()
+
+        return super().save(*args, **kwargs)
+
+
     class Meta:
         database = db
 
@@ -14,23 +39,73 @@ class BaseModel(Model):
 class Guild(BaseModel):
     id = BigIntegerField(unique=True, primary_key=True)
     configuration = TextField(default="{}")
-    updated_at = DateTimeField(
-        default=calendar.timegm(datetime.datetime.now().timetuple())
-    )
+    updated_at = EpochField(default=epoch_now)
 
 
 class Raid(BaseModel):
+    # BIGSERIAL on PostgreSQL; on SQLite still the INTEGER PRIMARY KEY rowid alias
+    id = BigAutoField()
+    guild = BigIntegerField()
+    organiser = BigIntegerField()
+    title = TextField()
+    description = TextField()
+    participants = TextField(default="{}")
+    apply_by = EpochField()
+    happens_on = EpochField()
+    updated_at = EpochField(default=epoch_now)
+    version = IntegerField(default=0)
+
+
+    class Meta:
+        indexes = (
+            (('guild', 'happens_on'), False),
+            (('guild', 'organiser', 'happens_on'), False),
+        )
+
+
+class ParticipantRole(str, enum.Enum):
+    Leader = "leader"
+    BackupLeader = "backup_leader"
+    Support = "support"
+
+
+class RaidParticipant(BaseModel):
+    raid = ForeignKeyField(Raid, backref='roster', on_delete='CASCADE')
+    user = BigIntegerField()
+    role = TextField()
+    joined_at = EpochField(default=epoch_now)
+
+
+    class Meta:
+        indexes = (
+            (('raid', 'user'), True),
+        )
+
+
+class RaidArchive(BaseModel):
     id = BigIntegerField(unique=True, primary_key=True)
     guild = BigIntegerField()
     organiser = BigIntegerField()
     title = TextField()
     description = TextField()
     participants = TextField(default="{}")
-    apply_by = DateTimeField()
-    happens_on = DateTimeField()
-    updated_at = DateTimeField(
-        default=calendar.timegm(datetime.datetime.now().timetuple())
-    )
+    apply_by = EpochField()
+    happens_on = EpochField()
+    updated_at = EpochField(default=epoch_now)
+    version = IntegerField(default=0)
+
+
+    class Meta:
+        indexes = (
+            (('guild', 'happens_on'), False),
+        )
+
+
+class RaidParticipantArchive(BaseModel):
+    raid = BigIntegerField(index=True)
+    user = BigIntegerField()
+    role = TextField()
+    joined_at = EpochField()
 
 
 class Riddle(BaseModel):
@@ -38,21 +113,23 @@ class Riddle(BaseModel):
     user = BigIntegerField()
     text = TextField()
     solution = TextField()
+    # normalised float16 embedding of the solution, so /solve only has to encode the answer
+    solution_embedding = BlobField(null=True)
     is_sudoku = BooleanField(default=False)
-    updated_at = DateTimeField(
-        default=calendar.timegm(datetime.datetime.now().timetuple())
-    )
+    updated_at = EpochField(default=epoch_now)
 
 
     class Meta:
         primary_key = CompositeKey('guild', 'user')
 
+
 class Subscriber(BaseModel):
     guild = ForeignKeyField(Guild, backref='subscribers')
     name = TextField()
-    since = DateTimeField()
-    until = DateTimeField()
-    updated_at = DateTimeField(
-        default=calendar.timegm(datetime.datetime.now().timetuple())
-    )
+    since = EpochField()
+    until = EpochField(index=True)
+    updated_at = EpochField(default=epoch_now)
+
 
+class SchemaVersion(BaseModel):
+    version = IntegerField(default=0)
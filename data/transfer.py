@@ -0,0 +1,223 @@
+import argparse
+import base64
+import csv
+import gzip
+import itertools
+import json
+import sys
+
+from datetime import date, datetime
+from peewee import AutoField, BlobField, BooleanField, IntegerField, Tuple
+
+from system.configuration import Configuration
+
+from data import database
+from data.models import db, Raid, RaidArchive, RaidParticipant, RaidParticipantArchive, Riddle, Subscriber
+
+TABLES = {
+    "raid": Raid,
+    "raidparticipant": RaidParticipant,
+    "raidarchive": RaidArchive,
+    "raidparticipantarchive": RaidParticipantArchive,
+    "riddle": Riddle,
+    "subscriber": Subscriber
+}
+
+FORMATS = ("jsonl", "csv")
+
+
+def _fields(model) -> list[str]:
+    return [field.name for field in model._meta.sorted_fields]
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (bytes, memoryview)):
+        return base64.b64encode(value).decode("ascii")
+
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+
+def _to_csv(value):
+    if isinstance(value, (datetime, date)):
+        return _default(value)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (bytes, memoryview)):
+        return _default(value)
+
+    return value
+
+
+def iter_rows(model, i_page: int = 5000):
+    # psycopg2 buffers a whole result client-side, so walk the table in primary-key pages to keep memory flat
+    keys = model._meta.get_primary_keys()
+    query = model.select().order_by(*keys).limit(i_page).dicts()
+    last = None
+
+    while True:
+        page = list(query if last is None else query.where(Tuple(*keys) > Tuple(*last)))
+
+        yield from page
+
+        if len(page) < i_page:
+            break
+
+        last = [page[-1][key.name] for key in keys]
+
+
+def export_jsonl(model, stream):
+    count = 0
+
+    for row in iter_rows(model):
+        stream.write(json.dumps(row, default=_default) + "\n")
+        count += 1
+
+    return count
+
+
+def export_csv(model, stream):
+    count = 0
+    writer = csv.DictWriter(stream, fieldnames=_fields(model))
+    writer.writeheader()
+
+    for row in iter_rows(model):
+        writer.writerow({key: _to_csv(value) for key, value in row.items()})
+        count += 1
+
+    return count
+
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _from_csv(field, value: str):
+    # CSV cannot tell NULL from an empty string, so only nullable columns read "" as NULL
+    if value == "" and field.null:
+        return None
+    if isinstance(field, BooleanField):
+        return value in ("1", "True", "true")
+    if isinstance(field, IntegerField):
+        return int(value)
+    if isinstance(field, BlobField):
+        return base64.b64decode(value)
+
+    return value
+
+
+def read_csv(model, stream):
+    fields = {field.name: field for field in model._meta.sorted_fields}
+
+    for row in csv.DictReader(stream):
+        yield {key: _from_csv(fields[key], value) for key, value in row.items() if key in fields}
+
+
+def _decode_blobs(model, row: dict) -> dict:
+    for field in model._meta.sorted_fields:
+        if isinstance(field, BlobField) and isinstance(row.get(field.name), str):
+            row[field.name] = base64.b64decode(row[field.name])
+
+    return row
+
+
+def import_rows(model, rows, i_chunk: int = 1000):
+    count = 0
+    rows = (_decode_blobs(model, row) for row in rows)
+
+    while True:
+        chunk = list(itertools.islice(rows, i_chunk))
+
+        if len(chunk) == 0:
+            break
+
+        # rows already present are skipped by key; every other constraint error is raised
+        with db.atomic():
+            count += (model
+                      .insert_many(chunk)
+                      .on_conflict(conflict_target=model._meta.get_primary_keys(), action="NOTHING")
+                      .as_rowcount()
+                      .execute())
+
+    _advance_sequence(model)
+
+    return count
+
+
+def _advance_sequence(model):
+    # imported rows carry their own ids, so PostgreSQL sequences have to be moved past them
+    key = model._meta.primary_key
+
+    if database.is_sqlite() or not isinstance(key, AutoField):
+        return
+
+    table = model._meta.table_name
+    db.execute_sql(f"SELECT setval(pg_get_serial_sequence('{table}', '{key.column_name}'), "
+                   f"COALESCE((SELECT MAX(\"{key.column_name}\") FROM \"{table}\"), 0) + 1, false)")
+
+
+def open_stream(path: str, mode: str):
+    if path == "-":
+        return sys.stdout if mode == "w" else sys.stdin
+
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def export_table(s_table: str, s_format: str, path: str):
+    model = TABLES[s_table]
+    stream = open_stream(path, "w")
+
+    try:
+        if s_format == "csv":
+            return export_csv(model, stream)
+
+        return export_jsonl(model, stream)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+
+def import_table(s_table: str, s_format: str, path: str, i_chunk: int = 1000):
+    model = TABLES[s_table]
+    stream = open_stream(path, "r")
+
+    try:
+        rows = read_csv(model, stream) if s_format == "csv" else read_jsonl(stream)
+        return import_rows(model, rows, i_chunk)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m data.transfer", description="Stream Bai tables in or out")
+    parser.add_argument("--config", default="conf.json")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    for action in ("export", "import"):
+        subparser = subparsers.add_parser(action)
+        subparser.add_argument("table", choices=TABLES.keys())
+        subparser.add_argument("path", help="File to read or write, '-' for stdio, '.gz' to compress")
+        subparser.add_argument("--format", choices=FORMATS, default="jsonl")
+
+    subparsers.choices["import"].add_argument("--chunk", type=int, default=1000)
+
+    args = parser.parse_args()
+    database.configure(Configuration(args.config).database)
+
+    if args.action == "export":
+        count = export_table(args.table, args.format, args.path)
+    else:
+        count = import_table(args.table, args.format, args.path, args.chunk)
+
+    print(f"{args.action}ed {count} row(s) of {args.table}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
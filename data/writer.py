@@ -0,0 +1,115 @@
+import asyncio
+
+from data.database import db, write_transaction
+
+
+def _commit(batch: list) -> list:
+    results = []
+
+    # one transaction (and one fsync) for the whole batch, with a savepoint per caller so failures stay isolated
+    with write_transaction():
+        for func, args, kwargs in batch:
+            try:
+                with db.atomic():
+                    results.append((True, func(*args, **kwargs)))
+            except Exception as e:
+                results.append((False, e))
+
+    return results
+
+
+class WriteQueue:
+    window: float
+    max_batch: int
+    commits: int
+    writes: int
+
+    def __init__(self, runner, window: float = 0.005, max_batch: int = 64):
+        self.runner = runner
+        self.window = window
+        self.max_batch = max_batch
+        self.commits = 0
+        self.writes = 0
+        self.queue: asyncio.Queue | None = None
+        self.task: asyncio.Task | None = None
+
+    def start(self):
+        if self.task is None:
+            self.queue = asyncio.Queue()
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.task is None:
+            return
+
+        await self.queue.put(None)
+        await self.task
+        self.task = None
+
+    async def submit(self, func, *args, **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((func, args, kwargs, future))
+
+        return await future
+
+    async def _collect(self) -> tuple[list, bool]:
+        loop = asyncio.get_running_loop()
+
+        item = await self.queue.get()
+
+        if item is None:
+            return [], True
+
+        batch = [item]
+        deadline = loop.time() + self.window
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+
+            if timeout <= 0:
+                break
+
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+            if item is None:
+                return batch, True
+
+            batch.append(item)
+
+        return batch, False
+
+    async def _run(self):
+        closing = False
+
+        while not closing:
+            batch, closing = await self._collect()
+
+            if len(batch) == 0:
+                continue
+
+            try:
+                results = await self.runner(_commit, [(func, args, kwargs) for func, args, kwargs, _ in batch])
+            except Exception as e:
+                results = [(False, e)] * len(batch)
+            else:
+                self.commits += 1
+                self.writes += len(batch)
+
+            for (_, _, _, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def stats(self) -> dict:
+        return {
+            "commits": self.commits,
+            "writes": self.writes,
+            "pending": 0 if self.queue is None else self.queue.qsize()
+        }
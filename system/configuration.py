@@ -7,6 +7,11 @@ class Configuration:
 
     def __init__(self, path: str):
         self.conf_path = path
+
+        # sub-sections are filled in by the parent
+        if path is None:
+            return
+
         with open(path, 'r') as file:
             data = json.load(file)
             for key, value in data.items():
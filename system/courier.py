@@ -0,0 +1,174 @@
+import asyncio
+import os
+
+import discord
+
+from system.dispatcher import Dispatcher, Priority
+
+MAX_EMBEDS = 10
+MAX_CHARACTERS = 6000
+MAX_FILES = 10
+
+
+def pack_embeds(embeds: list) -> list[list]:
+    batches = []
+    batch = []
+    size = 0
+
+    for embed in embeds:
+        length = len(embed)
+
+        if len(batch) > 0 and (len(batch) == MAX_EMBEDS or size + length > MAX_CHARACTERS):
+            batches.append(batch)
+            batch = []
+            size = 0
+
+        batch.append(embed)
+        size += length
+
+    if len(batch) > 0:
+        batches.append(batch)
+
+    return batches
+
+
+def pack_files(files: list[tuple[str, str]], limit: int) -> list[list]:
+    batches = []
+    batch = []
+    size = 0
+
+    for path, filename in files:
+        try:
+            length = os.path.getsize(path)
+        except OSError:
+            continue
+
+        # a file the guild can never accept is left out rather than sinking the whole message
+        if length > limit:
+            continue
+
+        if len(batch) > 0 and (len(batch) == MAX_FILES or size + length > limit):
+            batches.append(batch)
+            batch = []
+            size = 0
+
+        batch.append((path, filename))
+        size += length
+
+    if len(batch) > 0:
+        batches.append(batch)
+
+    return batches
+
+
+class Courier:
+    window: float
+    queues: dict
+    tasks: dict
+    embeds: int
+    messages: int
+    failures: int
+
+    def __init__(self, dispatcher: Dispatcher, window: float = 1.5, logger=None):
+        self.dispatcher = dispatcher
+        self.window = window
+        self.logger = logger
+        self.queues = {}
+        self.tasks = {}
+        self.embeds = 0
+        self.messages = 0
+        self.failures = 0
+        self.flushing = asyncio.Event()
+
+    def post(self, channel, embeds: list, files: list[tuple[str, str]] = ()):
+        if channel is None or len(embeds) == 0:
+            return
+
+        self.queues.setdefault(channel.id, []).append((embeds, list(files)))
+
+        # one drain task per channel keeps its messages in order
+        if channel.id not in self.tasks:
+            self.tasks[channel.id] = asyncio.create_task(self._drain(channel))
+
+    async def _drain(self, channel):
+        try:
+            while len(self.queues.get(channel.id, [])) > 0:
+                if not self.flushing.is_set():
+                    try:
+                        await asyncio.wait_for(self.flushing.wait(), self.window)
+                    except asyncio.TimeoutError:
+                        pass
+
+                await self._deliver(channel, self.queues.pop(channel.id))
+        finally:
+            self.tasks.pop(channel.id, None)
+
+    async def _deliver(self, channel, entries: list):
+        embeds = []
+
+        for entry, files in entries:
+            if len(files) == 0:
+                embeds.extend(entry)
+                continue
+
+            # files belong to one entry, so it goes out on its own after everything queued before it
+            for batch in pack_embeds(embeds):
+                await self._send(channel, batch)
+
+            embeds = []
+            batches = pack_embeds(entry)
+            uploads = pack_files(files, self._upload_limit(channel))
+
+            for batch in batches[:-1]:
+                await self._send(channel, batch)
+
+            await self._send(channel, batches[-1], uploads[0] if len(uploads) > 0 else ())
+
+            for upload in uploads[1:]:
+                await self._send(channel, [], upload)
+
+        for batch in pack_embeds(embeds):
+            await self._send(channel, batch)
+
+    @staticmethod
+    def _upload_limit(channel) -> int:
+        guild = getattr(channel, "guild", None)
+
+        return guild.filesize_limit if guild is not None else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+
+    async def _send(self, channel, batch: list, files: list[tuple[str, str]] = ()):
+        try:
+            await self.dispatcher.send(
+                channel, Priority.AuditLog, embeds=batch, files=[discord.File(path, filename) for path, filename in files]
+            )
+        except Exception as e:
+            # an upload the channel refuses must not cost the log entry itself
+            if isinstance(e, (discord.HTTPException, OSError)) and len(files) > 0 and len(batch) > 0:
+                if self.logger is not None:
+                    self.logger.warning(f"Could not upload {len(files)} file(s) to channel {channel.id}, "
+                                        f"sending the log without them: {e}")
+
+                await self._send(channel, batch)
+                return
+
+            self.failures += 1
+
+            if self.logger is not None:
+                self.logger.error(f"Could not deliver {len(batch)} log embed(s) to channel {channel.id}: {e}")
+        else:
+            self.embeds += len(batch)
+            self.messages += 1
+
+    async def close(self):
+        self.flushing.set()
+
+        if len(self.tasks) > 0:
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "embeds": self.embeds,
+            "messages": self.messages,
+            "failures": self.failures,
+            "pending": sum(len(embeds) for queue in self.queues.values() for embeds, _ in queue)
+        }
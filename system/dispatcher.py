@@ -0,0 +1,193 @@
+import asyncio
+import heapq
+import itertools
+import json
+import time
+
+from enum import IntEnum
+
+import discord
+
+
+class Priority(IntEnum):
+    Interaction = 0
+    RaidPing = 1
+    RaidEdit = 2
+    AuditLog = 3
+
+
+class TokenBucket:
+    capacity: float
+    rate: float
+    tokens: float
+    updated: float
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, reserve: float = 0) -> float:
+        self._refill()
+        missing = 1 + reserve - self.tokens
+
+        return 0 if missing <= 0 else missing / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def penalise(self, retry_after: float):
+        # Discord knows better than our model; empty the bucket for as long as it asks
+        self._refill()
+        self.tokens = min(self.tokens, 0) - retry_after * self.rate
+
+
+async def _retry_after(e: discord.HTTPException) -> float:
+    # the body's retry_after is precise; Retry-After is whole seconds, but Cloudflare sets it too
+    try:
+        return float(json.loads(await e.response.text())["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return float(e.response.headers.get("Retry-After", 1))
+
+
+class PriorityStats:
+    __slots__ = ("depth", "sent", "failed", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.depth = 0
+        self.sent = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class Dispatcher:
+    channel_rate: tuple
+    headroom: float
+    buckets: dict
+    queues: dict
+    tasks: dict
+    rate_limited: int
+
+    def __init__(self, channel_rate: tuple = (5, 5.0), global_rate: tuple = (50, 1.0), headroom: float = 2):
+        self.channel_rate = tuple(channel_rate)
+        self.glob = TokenBucket(*global_rate)
+        # lower classes must leave this many global tokens per step for the classes above them
+        self.headroom = headroom
+        self.buckets = {}
+        self.queues = {}
+        self.tasks = {}
+        self.counter = itertools.count()
+        self.rate_limited = 0
+        self.priorities = {priority: PriorityStats() for priority in Priority}
+
+    async def send(self, channel, e_priority: Priority, **kwargs):
+        return await self.submit(channel.id, e_priority, channel.send, **kwargs)
+
+    async def edit(self, message, e_priority: Priority, **kwargs):
+        return await self.submit(message.channel.id, e_priority, message.edit, **kwargs)
+
+    async def submit(self, i_channel: int, e_priority: Priority, func, *args, **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self.queues.setdefault(i_channel, []),
+            (e_priority, next(self.counter), time.monotonic(), func, args, kwargs, future)
+        )
+        self.priorities[e_priority].depth += 1
+
+        if i_channel not in self.tasks:
+            self.tasks[i_channel] = asyncio.create_task(self._drain(i_channel))
+
+        return await future
+
+    def _bucket(self, i_channel: int) -> TokenBucket:
+        bucket = self.buckets.get(i_channel)
+
+        if bucket is None:
+            bucket = self.buckets[i_channel] = TokenBucket(*self.channel_rate)
+
+        return bucket
+
+    async def _drain(self, i_channel: int):
+        queue = self.queues[i_channel]
+        bucket = self._bucket(i_channel)
+
+        try:
+            while len(queue) > 0:
+                # re-read the head after every wait so that late high-priority items jump ahead
+                priority = queue[0][0]
+                delay = max(bucket.delay(), self.glob.delay(priority * self.headroom))
+
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+
+                priority, sequence, enqueued, func, args, kwargs, future = heapq.heappop(queue)
+                bucket.take()
+                self.glob.take()
+
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    if isinstance(e, discord.RateLimited):
+                        retry_after = e.retry_after
+                    elif isinstance(e, discord.HTTPException) and e.status == 429:
+                        # discord.py gave up after sleeping through several 429s in a row
+                        retry_after = await _retry_after(e)
+                    else:
+                        self._account(priority, enqueued, False)
+
+                        if not future.done():
+                            future.set_exception(e)
+                        continue
+
+                    self.rate_limited += 1
+                    bucket.penalise(retry_after)
+                    # keep the original sequence number so the retry goes out before anything queued after it
+                    heapq.heappush(queue, (priority, sequence, enqueued, func, args, kwargs, future))
+                else:
+                    self._account(priority, enqueued, True)
+
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self.tasks.pop(i_channel, None)
+            self.queues.pop(i_channel, None)
+
+    def _account(self, e_priority: Priority, enqueued: float, ok: bool):
+        stats = self.priorities[e_priority]
+        wait = time.monotonic() - enqueued
+
+        stats.depth -= 1
+        stats.wait_total += wait
+        stats.wait_max = max(stats.wait_max, wait)
+
+        if ok:
+            stats.sent += 1
+        else:
+            stats.failed += 1
+
+    async def close(self):
+        if len(self.tasks) > 0:
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "priorities": {
+                priority.name: {
+                    "depth": stats.depth,
+                    "sent": stats.sent,
+                    "failed": stats.failed,
+                    "wait_avg": stats.wait_total / max(stats.sent + stats.failed, 1),
+                    "wait_max": stats.wait_max
+                }
+                for priority, stats in self.priorities.items()
+            },
+            "rate_limited": self.rate_limited
+        }
@@ -0,0 +1,206 @@
+import asyncio
+import enum
+import functools
+import re
+import time
+import unicodedata
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ModelState(str, enum.Enum):
+    Unloaded = "unloaded"
+    Loading = "loading"
+    Ready = "ready"
+    Failed = "failed"
+
+
+def normalise(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).casefold()
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    words = re.sub(r"[^\w\s]", " ", text).split()
+
+    # "a shadow" and "shadow" are the same answer
+    if len(words) > 1 and words[0] in ("a", "an", "the"):
+        words = words[1:]
+
+    return " ".join(words)
+
+
+class Embedder:
+    name: str
+    device: str
+    state: ModelState
+    load_time: float | None
+    window: float
+    max_batch: int
+    max_pending: int
+    batches: int
+    encoded: int
+
+    def __init__(self, name: str = "all-MiniLM-L6-v2", device: str = "cpu", logger=None,
+                 window: float = 0.01, max_batch: int = 64, max_pending: int = 256):
+        self.name = name
+        self.device = device
+        self.logger = logger
+        self.state = ModelState.Unloaded
+        self.load_time = None
+        self.model = None
+        self.task: asyncio.Task | None = None
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.batches = 0
+        self.encoded = 0
+        self.queue: asyncio.Queue | None = None
+        self.worker: asyncio.Task | None = None
+        # a single thread: torch already spreads one forward pass over every core
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bai-embed")
+
+    @property
+    def ready(self) -> bool:
+        return self.state == ModelState.Ready
+
+    def load(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._load())
+
+    async def _load(self):
+        self.state = ModelState.Loading
+        started = time.perf_counter()
+
+        try:
+            self.model = await asyncio.get_running_loop().run_in_executor(self.executor, self._build)
+        except Exception as e:
+            self.state = ModelState.Failed
+
+            if self.logger is not None:
+                self.logger.error(f"Could not load {self.name}: {e}")
+            return
+
+        self.load_time = time.perf_counter() - started
+        self.queue = asyncio.Queue(maxsize=self.max_pending)
+        self.worker = asyncio.create_task(self._run())
+        self.state = ModelState.Ready
+
+        if self.logger is not None:
+            self.logger.info(f"Loaded {self.name} in {self.load_time:.2f}s")
+
+    def _build(self):
+        # importing torch is most of the cost, so it stays off the startup path too
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(self.name, device=self.device)
+
+    async def close(self):
+        if self.worker is not None:
+            await self.queue.put(None)
+            await self.worker
+            self.worker = None
+            self.state = ModelState.Unloaded
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def encode(self, texts: list[str]) -> list:
+        future = asyncio.get_running_loop().create_future()
+        # a full queue makes callers wait here instead of piling up work
+        await self.queue.put((texts, future))
+
+        return await future
+
+    async def _collect(self) -> tuple[list, bool]:
+        loop = asyncio.get_running_loop()
+
+        item = await self.queue.get()
+
+        if item is None:
+            return [], True
+
+        batch = [item]
+        size = len(item[0])
+        deadline = loop.time() + self.window
+
+        while size < self.max_batch:
+            timeout = deadline - loop.time()
+
+            if timeout <= 0:
+                break
+
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+            if item is None:
+                return batch, True
+
+            batch.append(item)
+            size += len(item[0])
+
+        return batch, False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        closing = False
+
+        while not closing:
+            batch, closing = await self._collect()
+
+            if len(batch) == 0:
+                continue
+
+            texts = [text for item, _ in batch for text in item]
+
+            try:
+                vectors = await loop.run_in_executor(self.executor, functools.partial(
+                    self.model.encode, texts, batch_size=len(texts), normalize_embeddings=True
+                ))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.encoded += len(texts)
+            offset = 0
+
+            for item, future in batch:
+                if not future.done():
+                    future.set_result(list(vectors[offset:offset + len(item)]))
+
+                offset += len(item)
+
+    async def embed(self, text: str) -> bytes | None:
+        if not self.ready:
+            return None
+
+        vector, = await self.encode([text])
+
+        # float16 halves the row size and moves the cosine by well under a thousandth
+        return vector.astype("<f2").tobytes()
+
+    async def similarity(self, s_first: str, s_second: str, b_first: bytes = None) -> float:
+        if not self.ready:
+            return 1.0 if normalise(s_first) == normalise(s_second) else 0.0
+
+        if b_first is not None:
+            import numpy
+
+            first = numpy.frombuffer(b_first, dtype="<f2").astype(numpy.float32)
+            second, = await self.encode([s_second])
+        else:
+            first, second = await self.encode([s_first, s_second])
+
+        # embeddings are normalised, so the dot product is the cosine similarity
+        return float(first @ second)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.name,
+            "state": self.state.value,
+            "load_time": self.load_time,
+            "batches": self.batches,
+            "encoded": self.encoded,
+            "pending": 0 if self.queue is None else self.queue.qsize()
+        }
@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import random
+import time
+
+from system.embedder import Embedder
+from tests.probe import LagProbe, percentile
+
+SOLUTIONS = ("a shadow", "an echo", "time", "fire", "a river", "silence", "nothing", "a candle", "a map", "a keyboard",
+             "a piano", "the future", "darkness", "the wind", "an egg", "age", "breath", "a secret")
+
+
+async def _solve_inline(embedder: Embedder, f_arrival: float, s_solution: str, s_answer: str) -> float:
+    from sentence_transformers import util
+
+    # the old /solve: two forward passes on the event loop
+    solution = embedder.model.encode(s_solution, convert_to_tensor=True)
+    answer = embedder.model.encode(s_answer, convert_to_tensor=True)
+    util.pytorch_cos_sim(solution, answer).item()
+
+    # every call arrived together, so waiting for the others counts
+    return time.perf_counter() - f_arrival
+
+
+async def _solve_batched(embedder: Embedder, f_arrival: float, b_solution: bytes, s_solution: str, s_answer: str) -> float:
+    await embedder.similarity(s_solution, s_answer, b_solution)
+
+    return time.perf_counter() - f_arrival
+
+
+async def bench(s_model: str, i_calls: int):
+    embedder = Embedder(s_model)
+    embedder.load()
+    await embedder.task
+
+    rng = random.Random(1)
+    pairs = [(rng.choice(SOLUTIONS), rng.choice(SOLUTIONS)) for _ in range(i_calls)]
+    stored = {solution: await embedder.embed(solution) for solution in SOLUTIONS}
+
+    for mode in ("inline", "batched"):
+        # one warm-up pass so neither side pays for torch's first-call setup
+        await _solve_inline(embedder, time.perf_counter(), *pairs[0])
+
+        probe = LagProbe()
+        probe.start()
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+
+        if mode == "inline":
+            latencies = await asyncio.gather(*[_solve_inline(embedder, started, *pair) for pair in pairs])
+        else:
+            latencies = await asyncio.gather(*[
+                _solve_batched(embedder, started, stored[solution], solution, answer) for solution, answer in pairs
+            ])
+
+        elapsed = time.perf_counter() - started
+        await probe.stop()
+
+        print(f"{mode:7} {i_calls} solves in {elapsed * 1000:.0f} ms, p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+              f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms; {probe.summary()}")
+
+    print(f"batched {embedder.stats()['batches']} encode calls in total, including {len(SOLUTIONS)} stored solutions")
+    await embedder.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tests.bench_embedder",
+                                     description="Simultaneous /solve similarity checks, inline and micro-batched")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Model name or local path")
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(bench(args.model, args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from types import SimpleNamespace
+
+from data import asynchronous, database, interface, migrations
+from data.models import epoch_now, ParticipantRole
+from tests.probe import percentile
+
+
+async def _toggle(i_raid: int, i_user: int) -> float:
+    started = time.perf_counter()
+    await asynchronous.toggle_raid_participant(i_raid, i_user, ParticipantRole.Support)
+    return time.perf_counter() - started
+
+
+async def bench(b_group: bool, i_raid: int, i_burst: int):
+    if b_group:
+        asynchronous.start_group_commit()
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*[_toggle(i_raid, 1000 + i) for i in range(i_burst)])
+    elapsed = time.perf_counter() - started
+    commits = i_burst
+
+    if b_group:
+        commits = asynchronous.write_queue.stats()["commits"]
+        await asynchronous.stop_group_commit()
+
+    print(f"{'group' if b_group else 'single':6} {i_burst} toggles in {commits} commits, {elapsed * 1000:.0f} ms: "
+          f"{commits / elapsed:,.0f} commits/s, {i_burst / elapsed:,.0f} toggles/s, "
+          f"p50 {percentile(latencies, 0.5) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tests.bench_group_commit",
+                                     description="A burst of sign-ups on one raid with and without group commit")
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--synchronous", default="normal", help="SQLite synchronous pragma, 'full' fsyncs every commit")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for b_group in (False, True):
+        with tempfile.TemporaryDirectory() as directory:
+            database.configure(SimpleNamespace(backend="sqlite", path=os.path.join(directory, "data.db"),
+                                               pragmas={"synchronous": args.synchronous}))
+            migrations.run()
+            raid = interface.create_raid(1, 1, "Burst", "", epoch_now() + 3600, epoch_now() + 7200).id
+            asynchronous.start(args.workers)
+
+            try:
+                asyncio.run(bench(b_group, raid, args.burst))
+            finally:
+                asynchronous.shutdown()
+                database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from types import SimpleNamespace
+
+from data import asynchronous, database, interface, migrations
+from data.models import db, epoch_now, Raid, RaidParticipant, ParticipantRole
+from tests.probe import LagProbe, percentile
+
+
+def _seed(i_raids: int, i_roster: int):
+    now = epoch_now()
+
+    with db.atomic():
+        Raid.insert_many([
+            {"guild": 1, "organiser": i, "title": f"Raid {i}", "description": "", "apply_by": now + 3600,
+             "happens_on": now + 7200 + i}
+            for i in range(i_raids)
+        ]).execute()
+
+        for raid in range(1, i_raids + 1):
+            RaidParticipant.insert_many([
+                {"raid": raid, "user": 1000 + user, "role": ParticipantRole.Support.value} for user in range(i_roster)
+            ]).execute()
+
+
+async def _handler(b_offload: bool, f_arrival: float, i_raid: int, i_user: int) -> float:
+    await asyncio.sleep(f_arrival - time.perf_counter())
+
+    if b_offload:
+        await asynchronous.read_raid_roster(i_raid)
+        await asynchronous.get_user_raids(i_user, 1)
+        await asynchronous.toggle_raid_participant(i_raid, i_user, ParticipantRole.Support)
+    else:
+        interface.read_raid_roster(i_raid)
+        interface.get_user_raids(i_user, 1)
+        interface.toggle_raid_participant(i_raid, i_user, ParticipantRole.Support)
+
+    # measured from when the press arrived, so time spent waiting behind a blocked loop counts
+    return time.perf_counter() - f_arrival
+
+
+async def bench(b_offload: bool, i_handlers: int, f_rate: float, i_raids: int):
+    probe = LagProbe()
+    probe.start()
+    await asyncio.sleep(0.05)
+
+    rng = random.Random(1)
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*[
+        _handler(b_offload, started + i / f_rate, rng.randint(1, i_raids), 1000 + rng.randint(0, 200)) for i in range(i_handlers)
+    ])
+    elapsed = time.perf_counter() - started
+    await probe.stop()
+
+    print(f"{'async' if b_offload else 'sync ':5} {i_handlers} handlers in {elapsed:.2f}s, "
+          f"latency p50 {percentile(latencies, 0.5) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms; "
+          f"{probe.summary()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tests.bench_interface",
+                                     description="Event-loop lag of sign-up handlers on the sync and async interface")
+    parser.add_argument("--handlers", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=50, help="Button presses per second")
+    parser.add_argument("--raids", type=int, default=2000)
+    parser.add_argument("--roster", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database.configure(SimpleNamespace(backend="sqlite", path=os.path.join(directory, "data.db")))
+        migrations.run()
+        _seed(args.raids, args.roster)
+        asynchronous.start(args.workers)
+
+        try:
+            for b_offload in (False, True):
+                asyncio.run(bench(b_offload, args.handlers, args.rate, args.raids))
+        finally:
+            asynchronous.shutdown()
+            database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from data import database, interface, migrations
+from data.models import epoch_now, ParticipantRole
+from tests.probe import percentile
+
+# what the bot ran with before the shared database: SQLite's defaults, plus a busy timeout so writers queue
+ROLLBACK_PRAGMAS = {
+    "journal_mode": "delete",
+    "synchronous": "full",
+    "busy_timeout": 5000,
+    "cache_size": -2000,
+    "mmap_size": 0,
+    "temp_store": "default"
+}
+
+
+def _writer(i_raids: list[int], i_first: int, i_toggles: int) -> list[float]:
+    database.connect()
+    latencies = []
+
+    try:
+        for i in range(i_toggles):
+            started = time.perf_counter()
+            interface.toggle_raid_participant(i_raids[i % len(i_raids)], i_first + i, ParticipantRole.Support)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        database.close()
+
+    return latencies
+
+
+def _reader(i_raids: list[int], done: threading.Event) -> int:
+    database.connect()
+    reads = 0
+
+    try:
+        while not done.is_set():
+            interface.read_raid_roster(i_raids[reads % len(i_raids)])
+            reads += 1
+    finally:
+        database.close()
+
+    return reads
+
+
+def bench(s_label: str, o_pragmas: dict, i_writers: int, i_readers: int, i_toggles: int):
+    with tempfile.TemporaryDirectory() as directory:
+        database.configure(SimpleNamespace(backend="sqlite", path=os.path.join(directory, "data.db"), pragmas=o_pragmas))
+        migrations.run()
+        raids = [interface.create_raid(1, 1, f"Raid {i}", "", epoch_now() + 3600, epoch_now() + 7200).id for i in range(4)]
+        done = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=i_writers + i_readers) as executor:
+            readers = [executor.submit(_reader, raids, done) for _ in range(i_readers)]
+            started = time.perf_counter()
+            writers = [executor.submit(_writer, raids, 1000 * (i + 1), i_toggles) for i in range(i_writers)]
+            latencies = [latency for writer in writers for latency in writer.result()]
+            elapsed = time.perf_counter() - started
+            done.set()
+            reads = sum(reader.result() for reader in readers)
+
+        database.close()
+
+    print(f"{s_label:8} {len(latencies) / elapsed:,.0f} writes/s (p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms), {reads / elapsed:,.0f} roster reads/s alongside")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tests.bench_sqlite",
+                                     description="Concurrent sign-up writes on the rollback journal and on WAL")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--toggles", type=int, default=50, help="Toggles per writer")
+    args = parser.parse_args()
+
+    bench("rollback", ROLLBACK_PRAGMAS, args.writers, args.readers, args.toggles)
+    bench("wal", database.DEFAULT_PRAGMAS, args.writers, args.readers, args.toggles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+started = time.perf_counter()
+
+EXTENSIONS = ("commands.cog_config", "commands.cog_jail", "commands.cog_premium", "commands.cog_raid",
+              "commands.cog_utilities")
+
+
+async def child(b_background: bool, s_model: str):
+    import importlib
+
+    from system.embedder import Embedder
+
+    embedder = Embedder(s_model)
+
+    if b_background:
+        embedder.load()
+    else:
+        # the old path: Jail.__init__ built the model before the next extension could load
+        embedder.model = embedder._build()
+
+    for extension in EXTENSIONS:
+        importlib.import_module(extension)
+
+    serving = time.perf_counter() - started
+
+    if b_background:
+        await embedder.task
+
+    print(f"{serving:.3f} {time.perf_counter() - started:.3f}")
+    await embedder.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tests.bench_startup",
+                                     description="Cold start with the model loaded inline and in the background")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Model name or local path")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", choices=("inline", "background"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        asyncio.run(child(args.child == "background", args.model))
+        return
+
+    for mode in ("inline", "background"):
+        for _ in range(args.runs):
+            # a fresh interpreter each time, so torch and the extensions are imported cold
+            launched = time.perf_counter()
+            output = subprocess.run([sys.executable, "-m", "tests.bench_startup", "--child", mode, "--model", args.model],
+                                    check=True, capture_output=True, text=True, env=os.environ).stdout
+            total = time.perf_counter() - launched
+            serving, ready = output.split()[-2:]
+            print(f"{mode:10} extensions loaded at {float(serving):.2f}s, model ready at {float(ready):.2f}s "
+                  f"(process {total:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from types import SimpleNamespace
+
+from data import database, migrations, transfer
+from data.models import db, Raid
+from tests.test_database_backends import PostgreSQLServer
+
+
+def _rows(i_rows: int):
+    for i in range(1, i_rows + 1):
+        yield {"id": i, "guild": i % 100, "organiser": i, "title": f"Raid {i}", "description": "", "participants": "{}",
+               "apply_by": i, "happens_on": i, "updated_at": i, "version": 0}
+
+
+def _peak_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench(i_rows: int, directory: str):
+    migrations.run()
+
+    started = time.perf_counter()
+    imported = transfer.import_rows(Raid, _rows(i_rows))
+    elapsed = time.perf_counter() - started
+    print(f"import  {imported} rows in {elapsed:.1f}s ({imported / elapsed:,.0f} rows/s)")
+
+    before = _peak_mb()
+    started = time.perf_counter()
+
+    with open(os.path.join(directory, "raid.jsonl"), "w", encoding="utf-8") as stream:
+        exported = transfer.export_jsonl(Raid, stream)
+
+    elapsed = time.perf_counter() - started
+    print(f"export  {exported} rows in {elapsed:.1f}s ({exported / elapsed:,.0f} rows/s)")
+    print(f"peak RSS {before:.0f} MB before export, {_peak_mb():.0f} MB after")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m tests.bench_transfer",
+                                     description="Time a Raid export/import round trip through data.transfer")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--postgresql", action="store_true", help="Use a throwaway cluster from PG_BIN or PATH")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if not args.postgresql:
+            database.configure(SimpleNamespace(backend="sqlite", path=os.path.join(directory, "data.db")))
+            bench(args.rows, directory)
+            return
+
+        server = PostgreSQLServer()
+        server.start()
+
+        try:
+            database.configure(server.conf())
+            bench(args.rows, directory)
+        finally:
+            db.obj.close_all()
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import asyncio
+import contextlib
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+class LagProbe:
+    # how late a short sleep wakes up is how long something held the event loop
+    interval: float
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = []
+        self.task: asyncio.Task | None = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # let the sleep in flight wake up, or a stall right before stopping is never sampled
+        await asyncio.sleep(self.interval * 2)
+        self.task.cancel()
+
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.task
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(loop.time() - started - self.interval)
+
+    def summary(self) -> str:
+        if len(self.samples) == 0:
+            return "loop lag: no samples"
+
+        return (f"loop lag p50 {percentile(self.samples, 0.5) * 1000:.1f} ms, "
+                f"p99 {percentile(self.samples, 0.99) * 1000:.1f} ms, max {max(self.samples) * 1000:.1f} ms")
@@ -0,0 +1,90 @@
+import asyncio
+import tempfile
+import time
+import unittest
+
+from types import SimpleNamespace
+
+from aiohttp import web
+
+from data.attachments import AttachmentArchive
+
+
+class FakeCDN:
+    # serves every file once `release` is set, failing with a 500 while `broken`
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.requested = asyncio.Event()
+        self.broken = False
+        self.app = web.Application()
+        self.app.router.add_get("/{name}", self.file)
+
+    async def file(self, request):
+        self.requested.set()
+        await self.release.wait()
+
+        if self.broken:
+            return web.Response(status=500)
+
+        return web.Response(body=b"x" * 60)
+
+
+class AttachmentQuotaTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cdn = FakeCDN()
+        self.runner = web.AppRunner(self.cdn.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.base = f"http://127.0.0.1:{self.runner.addresses[0][1]}"
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive = AttachmentArchive(self.directory.name, guild_quota=100)
+        self.archive.start()
+
+    async def asyncTearDown(self):
+        self.cdn.release.set()
+        await self.archive.close()
+        await self.runner.cleanup()
+        self.directory.cleanup()
+
+    def _message(self, i_message: int, name: str):
+        attachment = SimpleNamespace(size=60, url=f"{self.base}/{name}", filename=name, content_type=None)
+        return SimpleNamespace(id=i_message, guild=SimpleNamespace(id=1), attachments=[attachment])
+
+    async def _settle(self):
+        await asyncio.gather(*[task for tasks in self.archive.inflight.values() for task in tasks])
+
+    async def test_prune_keeps_pending_reservations(self):
+        self.archive.preserve(self._message(1, "a"))
+        await self.cdn.requested.wait()
+
+        await asyncio.to_thread(self.archive.prune, int(time.time()))
+
+        # the pending download still holds its share of the quota
+        self.archive.preserve(self._message(2, "b"))
+        self.assertEqual(self.archive.counters["skipped"], 1)
+
+        self.cdn.broken = True
+        self.cdn.release.set()
+        await self._settle()
+
+        self.assertEqual(self.archive.counters["failed"], 1)
+        self.assertEqual(self.archive.reserved, {1: 0})
+        self.assertEqual(self.archive.usage, {})
+
+    async def test_stored_file_moves_from_reserved_to_usage(self):
+        self.cdn.release.set()
+        self.archive.preserve(self._message(1, "a"))
+        await self._settle()
+
+        self.assertEqual(self.archive.reserved, {1: 0})
+        self.assertEqual(self.archive.usage, {1: 60})
+
+        # usage rebuilt from the index agrees with what was charged
+        await asyncio.to_thread(self.archive.prune, 0)
+        self.assertEqual(self.archive.usage, {1: 60})
+
+
+if __name__ == "__main__":
+    unittest.main()
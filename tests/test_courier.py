@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from types import SimpleNamespace
+
+import discord
+
+from system.courier import Courier, pack_files
+
+
+class FakeDispatcher:
+    # refuses any message whose files add up to more than the guild allows, like Discord's 413
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.sent = []
+
+    async def send(self, channel, e_priority, **kwargs):
+        size = sum(os.path.getsize(file.fp.name) for file in kwargs["files"])
+
+        for file in kwargs["files"]:
+            file.close()
+
+        if size > self.limit:
+            raise discord.HTTPException(SimpleNamespace(status=413, reason="Payload Too Large"), "Request entity too large")
+
+        self.sent.append((len(kwargs["embeds"]), [file.filename for file in kwargs["files"]]))
+
+
+class CourierFilesTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _file(self, name: str, size: int) -> tuple[str, str]:
+        path = os.path.join(self.directory.name, name)
+
+        with open(path, "wb") as file:
+            file.write(b"x" * size)
+
+        return path, name
+
+    def test_pack_files_splits_at_the_limit_and_drops_oversized(self):
+        files = [self._file("a", 60), self._file("b", 60), self._file("c", 200), self._file("d", 30)]
+
+        self.assertEqual([[name for _, name in batch] for batch in pack_files(files, 100)], [["a"], ["b", "d"]])
+
+    async def test_files_never_exceed_the_upload_limit(self):
+        dispatcher = FakeDispatcher(limit=100)
+        channel = SimpleNamespace(id=1, guild=SimpleNamespace(filesize_limit=100))
+        courier = Courier(dispatcher, window=0)
+
+        courier.post(channel, ["embed"], [self._file("a", 60), self._file("b", 60)])
+        await courier.close()
+
+        self.assertEqual(dispatcher.sent, [(1, ["a"]), (0, ["b"])])
+        self.assertEqual(courier.stats()["failures"], 0)
+
+    async def test_refused_upload_still_delivers_the_embeds(self):
+        # the guild reports more than the channel really accepts
+        dispatcher = FakeDispatcher(limit=10)
+        channel = SimpleNamespace(id=1, guild=SimpleNamespace(filesize_limit=100))
+        courier = Courier(dispatcher, window=0)
+
+        courier.post(channel, ["embed"], [self._file("a", 60)])
+        await courier.close()
+
+        self.assertEqual(dispatcher.sent, [(1, [])])
+        self.assertEqual(courier.stats()["failures"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
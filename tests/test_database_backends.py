@@ -0,0 +1,204 @@
+import asyncio
+import io
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+from peewee import PostgresqlDatabase
+
+from data import asynchronous, database, interface, migrations, transfer
+from data.models import db, Raid, RaidArchive, RaidParticipantArchive, ParticipantRole, epoch_now
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class PostgreSQLServer:
+    # a throwaway cluster from the initdb/pg_ctl on PATH, or in PG_BIN when set
+    def __init__(self):
+        self.directory = tempfile.mkdtemp()
+        self.data = os.path.join(self.directory, "data")
+        self.port = _free_port()
+        self.bin = os.environ.get("PG_BIN")
+
+    @staticmethod
+    def available() -> bool:
+        path = os.environ.get("PG_BIN")
+        return shutil.which("initdb", path=path) is not None and shutil.which("pg_ctl", path=path) is not None
+
+    def _run(self, command: str, *args: str):
+        subprocess.run([shutil.which(command, path=self.bin), *args], check=True, capture_output=True)
+
+    def start(self):
+        self._run("initdb", "-D", self.data, "-U", "bai", "--auth=trust", "-E", "UTF8")
+        self._run("pg_ctl", "-D", self.data, "-l", os.path.join(self.directory, "log"), "-w", "start",
+                  "-o", f"-p {self.port} -k {self.directory} -c listen_addresses=''")
+
+    def stop(self):
+        if os.path.exists(self.data):
+            self._run("pg_ctl", "-D", self.data, "-m", "immediate", "-w", "stop")
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def conf(self) -> SimpleNamespace:
+        return SimpleNamespace(backend="postgresql", postgresql={
+            "name": "postgres", "host": self.directory, "port": self.port, "user": "bai", "max_connections": 4
+        })
+
+
+class DDLTest(unittest.TestCase):
+    def test_raid_id_is_generated_on_postgresql(self):
+        previous = db.obj
+        db.initialize(PostgresqlDatabase("ddl"))
+
+        try:
+            sql, _ = Raid._schema._create_table().query()
+        finally:
+            db.initialize(previous)
+
+        self.assertIn('"id" BIGSERIAL NOT NULL PRIMARY KEY', sql)
+
+
+class BackendSmokeTest:
+    # mixed into one TestCase per backend, each providing configure()
+    def setUp(self):
+        self.configure()
+        migrations.run()
+
+    def tearDown(self):
+        if hasattr(db.obj, "close_all"):
+            db.obj.close_all()
+
+        database.close()
+
+    def test_raid_crud(self):
+        first = interface.create_raid(1, 1, "First", "", epoch_now() - 7200, epoch_now() - 3600)
+        second = interface.create_raid(1, 2, "Second", "Later", epoch_now() + 3600, epoch_now() + 7200)
+        self.assertNotEqual(first.id, second.id)
+
+        interface.toggle_raid_participant(second.id, 10, ParticipantRole.Support)
+        interface.set_raid_leader(second.id, 11)
+        interface.update_raid(second.id, s_title="Renamed")
+
+        roster = interface.read_raid_roster(second.id)
+        self.assertEqual(roster.raid.title, "Renamed")
+        self.assertEqual(roster.supports, frozenset({10}))
+        self.assertEqual(roster.leaders, frozenset({11}))
+
+        self.assertEqual(interface.archive_raids(datetime.now()), 1)
+        self.assertEqual(interface.read_raid(first.id).title, "First")
+
+    def test_same_user_toggling_concurrently_is_retried(self):
+        raid = interface.create_raid(1, 1, "Raid", "", epoch_now() + 3600, epoch_now() + 7200).id
+        # three writers leave the fourth pooled connection to this thread
+        barrier = threading.Barrier(3, timeout=30)
+
+        def toggle():
+            database.connect()
+
+            try:
+                for _ in range(30):
+                    barrier.wait()
+                    interface.toggle_raid_participant(raid, 10, ParticipantRole.Support)
+            finally:
+                database.close()
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            for future in [executor.submit(toggle) for _ in range(3)]:
+                future.result()
+
+        # an even number of toggles by one user always ends where it started
+        self.assertEqual(interface.get_raid_supports(raid), [])
+        self.assertEqual(Raid.get_by_id(raid).version, 90)
+
+    def test_delete_archived_raid_removes_its_participants(self):
+        first = interface.create_raid(1, 1, "First", "", epoch_now() - 7200, epoch_now() - 3600)
+        interface.create_raid(1, 2, "Second", "", epoch_now() + 3600, epoch_now() + 7200)
+        interface.toggle_raid_participant(first.id, 10, ParticipantRole.Support)
+        interface.archive_raids(datetime.now())
+
+        interface.delete_raid(first.id)
+
+        self.assertEqual(RaidArchive.select().count(), 0)
+        self.assertEqual(RaidParticipantArchive.select().count(), 0)
+
+    def test_import_moves_generated_ids_past_imported_rows(self):
+        stream = io.StringIO('{"id": 500, "guild": 1, "organiser": 1, "title": "Imported", "description": "", '
+                             '"participants": "{}", "apply_by": 0, "happens_on": 0, "updated_at": 0, "version": 0}\n')
+        self.assertEqual(transfer.import_rows(Raid, transfer.read_jsonl(stream)), 1)
+
+        raid = interface.create_raid(1, 1, "Created", "", epoch_now(), epoch_now())
+        self.assertGreater(raid.id, 500)
+
+    def test_csv_round_trip_keeps_empty_text(self):
+        interface.create_raid(1, 1, "Empty", "", epoch_now(), epoch_now())
+        interface.create_raid(1, 2, "Full", "Described", epoch_now() + 60, epoch_now() + 60)
+
+        stream = io.StringIO()
+        self.assertEqual(transfer.export_csv(Raid, stream), 2)
+        Raid.delete().execute()
+
+        rows = transfer.read_csv(Raid, io.StringIO(stream.getvalue()))
+        self.assertEqual(transfer.import_rows(Raid, rows), 2)
+        self.assertEqual(sorted(raid.description for raid in Raid.select()), ["", "Described"])
+
+        # a second import only finds rows that are already there
+        rows = transfer.read_csv(Raid, io.StringIO(stream.getvalue()))
+        self.assertEqual(transfer.import_rows(Raid, rows), 0)
+
+
+class SQLiteSmokeTest(BackendSmokeTest, unittest.TestCase):
+    def configure(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        database.configure(SimpleNamespace(backend="sqlite", path=os.path.join(self.directory.name, "data.db")))
+
+
+@unittest.skipUnless(PostgreSQLServer.available(), "initdb and pg_ctl are not on PATH or in PG_BIN")
+class PostgreSQLSmokeTest(BackendSmokeTest, unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = PostgreSQLServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def configure(self):
+        database.configure(self.server.conf())
+
+        # every test starts from an empty schema on the shared server
+        db.execute_sql("DROP SCHEMA public CASCADE")
+        db.execute_sql("CREATE SCHEMA public")
+
+    def test_offloaded_calls_survive_dropped_connections(self):
+        raid = interface.create_raid(1, 1, "Raid", "", epoch_now(), epoch_now()).id
+        asynchronous.start(2)
+        self.addCleanup(asynchronous.shutdown)
+
+        self.assertEqual(asyncio.run(asynchronous.read_raid(raid)).title, "Raid")
+        # only this thread still holds a connection; the worker's went back to the pool
+        self.assertEqual(len(db.obj._in_use), 1)
+
+        # what a server restart or an idle timeout does to the pooled connections
+        db.execute_sql("SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                       "WHERE datname = current_database() AND pid <> pg_backend_pid()")
+
+        self.assertEqual(asyncio.run(asynchronous.read_raid(raid)).title, "Raid")
+        self.assertEqual(len(db.obj._in_use), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+import unittest
+
+import discord
+
+from aiohttp import web
+
+from system.dispatcher import Dispatcher, Priority
+
+
+def _json(payload: dict, status: int = 200, headers: dict = None) -> web.Response:
+    # discord.py only parses bodies whose content type is exactly application/json
+    return web.Response(body=json.dumps(payload).encode(), status=status,
+                        headers={"Content-Type": "application/json"} | (headers or {}))
+
+
+class FakeDiscord:
+    # the two REST routes a bot needs to log in and post, answering the first `limited` posts with a 429
+    def __init__(self, limited: int, retry_after: float):
+        self.limited = limited
+        self.retry_after = retry_after
+        self.requests = 0
+        self.received = []
+        self.app = web.Application()
+        self.app.router.add_get("/api/v10/users/@me", self.me)
+        self.app.router.add_post("/api/v10/channels/{channel}/messages", self.messages)
+
+    @staticmethod
+    def _user() -> dict:
+        return {"id": "1", "username": "bai", "discriminator": "0", "avatar": None, "bot": True}
+
+    async def me(self, request):
+        return _json(self._user())
+
+    async def messages(self, request):
+        self.requests += 1
+        body = await request.json()
+
+        if self.limited > 0:
+            self.limited -= 1
+            # discord.py treats a 429 without Via as a Cloudflare ban; Retry-After is rounded up to whole seconds
+            return _json(
+                {"message": "You are being rate limited.", "retry_after": self.retry_after, "global": False},
+                status=429, headers={"Via": "1.1 google", "Retry-After": "1"}
+            )
+
+        self.received.append(body["content"])
+
+        return _json({
+            "id": str(self.requests), "channel_id": request.match_info["channel"], "author": self._user(),
+            "content": body["content"], "timestamp": "2025-01-01T00:00:00+00:00", "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+            "embeds": [], "pinned": False, "type": 0
+        })
+
+
+class DispatcherRateLimitTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # discord.py sleeps through up to five 429s for one request before it raises
+        self.fake = FakeDiscord(limited=5, retry_after=0.2)
+        self.runner = web.AppRunner(self.fake.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+
+        self.base = discord.http.Route.BASE
+        discord.http.Route.BASE = f"http://127.0.0.1:{self.runner.addresses[0][1]}/api/v10"
+
+        self.client = discord.Client(intents=discord.Intents.none())
+        await self.client.http.static_login("token")
+
+    async def asyncTearDown(self):
+        await self.client.http.close()
+        await self.runner.cleanup()
+        discord.http.Route.BASE = self.base
+
+    async def test_429_is_requeued_in_order(self):
+        dispatcher = Dispatcher(channel_rate=(50, 1.0), global_rate=(50, 1.0))
+        channel = self.client.get_partial_messageable(123)
+        started = time.monotonic()
+
+        await asyncio.gather(*[dispatcher.send(channel, Priority.AuditLog, content=content) for content in ("a", "b", "c")])
+
+        self.assertEqual(self.fake.received, ["a", "b", "c"])
+        self.assertEqual(self.fake.requests, 8)
+        self.assertEqual(dispatcher.stats()["rate_limited"], 1)
+        self.assertEqual(dispatcher.stats()["priorities"]["AuditLog"]["sent"], 3)
+        # five sleeps inside discord.py, then the channel bucket was emptied for the body's retry_after
+        self.assertGreaterEqual(time.monotonic() - started, 6 * self.fake.retry_after)
+
+        await dispatcher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from data.maintenance import enable_incremental_vacuum, incremental_vacuum
+
+
+class IncrementalVacuumTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "data.db")
+
+        connection = sqlite3.connect(self.path, isolation_level=None)
+        connection.execute("CREATE TABLE t (x TEXT)")
+        connection.executemany("INSERT INTO t VALUES (?)", [("x" * 500,)] * 2000)
+        connection.execute("DELETE FROM t")
+        connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(connection.close)
+        return connection
+
+    def test_scheduled_run_never_rewrites_an_unconverted_file(self):
+        connection = self._connect()
+        free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+
+        self.assertEqual(incremental_vacuum(connection, 10), 0)
+        self.assertEqual(connection.execute("PRAGMA auto_vacuum").fetchone()[0], 0)
+        self.assertEqual(connection.execute("PRAGMA freelist_count").fetchone()[0], free)
+
+    def test_converted_file_reclaims_a_bounded_number_of_pages(self):
+        self.assertTrue(enable_incremental_vacuum(self.path))
+        self.assertFalse(enable_incremental_vacuum(self.path))
+
+        connection = self._connect()
+        connection.executemany("INSERT INTO t VALUES (?)", [("x" * 500,)] * 2000)
+        connection.execute("DELETE FROM t")
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+
+        self.assertEqual(incremental_vacuum(connection, 10), 10 * page_size)
+        self.assertEqual(connection.execute("PRAGMA freelist_count").fetchone()[0], free - 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from data.messages import MessageStore, StoredMessage
+
+
+def _message(i_message: int) -> StoredMessage:
+    return StoredMessage(i_message, 1, 2, 3, "author", False, "content", (), 0)
+
+
+class MessageStoreCloseTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "messages.db")
+
+    async def test_close_waits_for_a_running_flush(self):
+        store = MessageStore(self.path, interval=0)
+        store.start()
+
+        for i_message in range(1, 2001):
+            store.put(_message(i_message))
+
+        # let the flusher take the batch and hand it to its thread
+        await asyncio.sleep(0.01)
+        await store.close()
+
+        reopened = MessageStore(self.path)
+        self.addCleanup(reopened.connection.close)
+        self.assertEqual(reopened.count, 2000)
+
+    async def test_close_waits_for_pending_deletes(self):
+        store = MessageStore(self.path)
+        store.put(_message(1))
+        store.put(_message(2))
+        await store._write()
+
+        store.discard([1])
+        self.assertEqual(len(store.deletes), 1)
+        await store.close()
+
+        reopened = MessageStore(self.path)
+        self.addCleanup(reopened.connection.close)
+        self.assertEqual(reopened.count, 1)
+        self.assertIsNone(await reopened.get(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
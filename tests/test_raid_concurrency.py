@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from data import database, interface, migrations
+from data.models import Raid, ParticipantRole, epoch_now
+
+
+class RaidConcurrencyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database.configure(SimpleNamespace(backend="sqlite", path=os.path.join(self.directory.name, "data.db")))
+        migrations.run()
+        self.raid = interface.create_raid(1, 1, "Raid", "", epoch_now() + 3600, epoch_now() + 7200).id
+
+    def tearDown(self):
+        database.close()
+        self.directory.cleanup()
+
+    def test_concurrent_toggles_and_updates_lose_nothing(self):
+        users = range(1000, 1300)
+
+        # every worker holds its own connection, like the data executor in production
+        with ThreadPoolExecutor(max_workers=16, initializer=database.connect) as executor:
+            toggles = [executor.submit(interface.toggle_raid_participant, self.raid, user, ParticipantRole.Support)
+                       for user in users]
+            updates = [executor.submit(interface.update_raid, self.raid, s_title=f"Raid {i}") for i in range(100)]
+            leaders = [executor.submit(interface.set_raid_leader, self.raid, user) for user in range(10, 20)]
+
+            results = [future.result() for future in toggles]
+
+            for future in updates + leaders:
+                future.result()
+
+        self.assertTrue(all(result == interface.SignUp.Registered for result in results))
+        self.assertEqual(set(interface.get_raid_supports(self.raid)), set(users))
+        self.assertEqual(len(interface.get_raid_leaders(self.raid)), 1)
+        self.assertEqual(Raid.get_by_id(self.raid).version, len(toggles) + len(updates) + len(leaders))
+
+
+if __name__ == "__main__":
+    unittest.main()
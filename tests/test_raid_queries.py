@@ -0,0 +1,76 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from data import asynchronous, database, interface, migrations
+from data.database import count_queries
+from data.models import epoch_now, ParticipantRole
+
+
+class RaidQueryCountTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        database.configure(SimpleNamespace(backend="sqlite", path=os.path.join(self.directory.name, "data.db")))
+        migrations.run()
+        self.raid = interface.create_raid(1, 1, "Raid", "", epoch_now() + 3600, epoch_now() + 7200).id
+
+    def tearDown(self):
+        asynchronous.shutdown()
+        database.close()
+
+    def test_roster_is_one_query(self):
+        interface.set_raid_leader(self.raid, 10)
+        interface.toggle_raid_participant(self.raid, 11, ParticipantRole.Support)
+
+        queries = count_queries()
+        roster = interface.read_raid_roster(self.raid)
+
+        self.assertEqual(queries.count, 1)
+        self.assertEqual(roster.leaders, frozenset({10}))
+        self.assertEqual(roster.supports, frozenset({11}))
+
+    def test_archived_roster_falls_back_with_one_more_query(self):
+        interface.toggle_raid_participant(self.raid, 11, ParticipantRole.Support)
+        # the newest raid is never archived
+        interface.create_raid(1, 1, "Later", "", epoch_now() + 172800, epoch_now() + 172800)
+        interface.archive_raids(datetime.fromtimestamp(epoch_now() + 86400))
+
+        queries = count_queries()
+        roster = interface.read_raid_roster(self.raid)
+
+        self.assertEqual(queries.count, 2)
+        self.assertEqual(roster.supports, frozenset({11}))
+
+    def test_toggle_queries(self):
+        # begin, version read, participant read, insert or delete, version bump
+        queries = count_queries()
+        interface.toggle_raid_participant(self.raid, 11, ParticipantRole.Support)
+        self.assertEqual(queries.count, 5)
+
+        queries = count_queries()
+        interface.toggle_raid_participant(self.raid, 11, ParticipantRole.Support)
+        self.assertEqual(queries.count, 5)
+
+        # a capacity check adds one count
+        queries = count_queries()
+        interface.toggle_raid_participant(self.raid, 12, ParticipantRole.Support, 5)
+        self.assertEqual(queries.count, 6)
+
+    def test_offloaded_click_is_counted(self):
+        async def click():
+            # what a sign-up button does, counted the way BaseView.interaction_check does
+            queries = count_queries()
+            await asynchronous.toggle_raid_participant(self.raid, 11, ParticipantRole.Support)
+            await asynchronous.read_raid_roster(self.raid)
+            return queries.count
+
+        self.assertEqual(asyncio.run(click()), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()